@@ -1,6 +1,9 @@
 # othello.py
 # シンプルなコンソール版オセロ（2人対戦用）
 
+import othello_engine as engine
+import othello_record as record
+
 BOARD_SIZE = 8
 
 def init_board():
@@ -17,48 +20,16 @@ def print_board(board):
         print(str(i) + " " + " ".join(row))
     print()
 
-def is_on_board(x, y):
-    return 0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE
-
 def valid_moves(board, player):
     """有効な手をリストで返す"""
-    opponent = "O" if player == "X" else "X"
-    moves = []
-
-    for x in range(BOARD_SIZE):
-        for y in range(BOARD_SIZE):
-            if board[x][y] != ".":
-                continue
-            flips = []
-            # 8方向チェック
-            for dx, dy in [(-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1)]:
-                nx, ny = x + dx, y + dy
-                temp = []
-                while is_on_board(nx, ny) and board[nx][ny] == opponent:
-                    temp.append((nx, ny))
-                    nx += dx
-                    ny += dy
-                if is_on_board(nx, ny) and board[nx][ny] == player and temp:
-                    flips.extend(temp)
-            if flips:
-                moves.append((x, y))
-    return moves
+    return engine.valid_moves(board, player)
 
 def make_move(board, x, y, player):
     """石を置いて盤面を更新"""
-    opponent = "O" if player == "X" else "X"
+    # 裏返す石はビットボードで求める
+    for fx, fy in engine.flipped_squares(board, x, y, player):
+        board[fx][fy] = player
     board[x][y] = player
-    # 8方向の石を裏返す
-    for dx, dy in [(-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1)]:
-        nx, ny = x + dx, y + dy
-        flips = []
-        while is_on_board(nx, ny) and board[nx][ny] == opponent:
-            flips.append((nx, ny))
-            nx += dx
-            ny += dy
-        if is_on_board(nx, ny) and board[nx][ny] == player:
-            for fx, fy in flips:
-                board[fx][fy] = player
 
 def count_discs(board):
     """石の数を数える"""
@@ -69,6 +40,7 @@ def count_discs(board):
 def main():
     board = init_board()
     player = "X"
+    history = []    # 打った手 (x, y)。終局したら棋譜ファイルに追記する
 
     while True:
         print_board(board)
@@ -89,10 +61,12 @@ def main():
             continue
 
         make_move(board, x, y, player)
+        history.append((x, y))
         player = "O" if player == "X" else "X"
 
     # ゲーム終了
     print_board(board)
+    record.save_game(history, record.HUMAN, record.HUMAN)
     x_count, o_count = count_discs(board)
     print(f"X: {x_count}, O: {o_count}")
     if x_count > o_count:
@@ -1,15 +1,15 @@
 # othello_ai_console.py
 # コンソール版オセロ：人間(黒=X) vs AI(白=O)
 
-import math
-import copy
+
+import othello_engine as engine
+import othello_record as record
+import othello_search as search
 
 BOARD_SIZE = 8
 HUMAN, AI = "X", "O"
 EMPTY = "."
 
-DIRECTIONS = [(-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1)]
-
 # 角重視の位置評価（簡易）
 POS_WEIGHT = [
     [120,-20, 20,  5,  5, 20,-20,120],
@@ -28,9 +28,6 @@ def init_board():
     b[3][4] = b[4][3] = "X"
     return b
 
-def in_bounds(x, y):
-    return 0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE
-
 def print_board(board):
     print("   " + " ".join(str(j) for j in range(BOARD_SIZE)))
     for i in range(BOARD_SIZE):
@@ -44,111 +41,46 @@ def count_discs(board):
     return x, o
 
 def valid_moves(board, player):
-    opp = AI if player == HUMAN else HUMAN
-    moves = []
-    for x in range(BOARD_SIZE):
-        for y in range(BOARD_SIZE):
-            if board[x][y] != EMPTY:
-                continue
-            flips_any = False
-            for dx, dy in DIRECTIONS:
-                nx, ny = x + dx, y + dy
-                seen = False
-                while in_bounds(nx, ny) and board[nx][ny] == opp:
-                    seen = True
-                    nx += dx; ny += dy
-                if seen and in_bounds(nx, ny) and board[nx][ny] == player:
-                    flips_any = True
-                    break
-            if flips_any:
-                moves.append((x, y))
-    return moves
+    return engine.valid_moves(board, player)
 
 def make_move(board, x, y, player):
     """前提：合法手。裏返し適用した新盤面を返す"""
-    opp = AI if player == HUMAN else HUMAN
-    nb = copy.deepcopy(board)
-    nb[x][y] = player
-    for dx, dy in DIRECTIONS:
-        nx, ny = x + dx, y + dy
-        path = []
-        while in_bounds(nx, ny) and nb[nx][ny] == opp:
-            path.append((nx, ny))
-            nx += dx; ny += dy
-        if path and in_bounds(nx, ny) and nb[nx][ny] == player:
-            for px, py in path:
-                nb[px][py] = player
-    return nb
+    own, opp = engine.board_to_bits(board, player)
+    own, opp = engine.play(own, opp, engine.square(x, y))
+    return engine.bits_to_board(own, opp, player)
 
 def game_over(board):
     return not valid_moves(board, HUMAN) and not valid_moves(board, AI)
 
-def evaluate(board, player_root=HUMAN):
-    """位置重み + 石差 + モビリティ（簡易）"""
-    score_pos = 0
-    x_cnt, o_cnt = count_discs(board)
-    for i in range(BOARD_SIZE):
-        for j in range(BOARD_SIZE):
-            if board[i][j] == "X":
-                score_pos += POS_WEIGHT[i][j]
-            elif board[i][j] == "O":
-                score_pos -= POS_WEIGHT[i][j]
-    disc_diff = x_cnt - o_cnt
-    mob_diff = len(valid_moves(board, HUMAN)) - len(valid_moves(board, AI))
-    raw = 4*score_pos + 2*disc_diff + 8*mob_diff
-    return raw if player_root == HUMAN else -raw
-
-def minimax_max(board, me, opp, depth, alpha, beta, player_root):
-    """me側：最大化ノード"""
-    if depth == 0 or game_over(board):
-        return evaluate(board, player_root), None
-    mvs = valid_moves(board, me)
-    if not mvs:
-        # パスして相手番へ
-        return minimax_min(board, me, opp, depth-1, alpha, beta, player_root)
-    best = None
-    for mv in sorted(mvs, key=lambda m: -POS_WEIGHT[m[0]][m[1]]):
-        nb = make_move(board, mv[0], mv[1], me)
-        sc, _ = minimax_min(nb, me, opp, depth-1, alpha, beta, player_root)
-        if sc > alpha:
-            alpha, best = sc, mv
-        if alpha >= beta:
-            break
-    return alpha, best
-
-def minimax_min(board, me, opp, depth, alpha, beta, player_root):
-    """opp側：最小化ノード"""
-    if depth == 0 or game_over(board):
-        return evaluate(board, player_root), None
-    mvs = valid_moves(board, opp)
-    if not mvs:
-        # 相手がパス→自分手番へ
-        return minimax_max(board, me, opp, depth-1, alpha, beta, player_root)
-    best = None
-    for mv in sorted(mvs, key=lambda m: POS_WEIGHT[m[0]][m[1]]):
-        nb = make_move(board, mv[0], mv[1], opp)
-        sc, _ = minimax_max(nb, me, opp, depth-1, alpha, beta, player_root)
-        if sc < beta:
-            beta, best = sc, mv
-        if alpha >= beta:
-            break
-    return beta, best
-
-def ai_choice(board, depth=3):
-    """AI(白=O)の手をミニマックスで選ぶ"""
-    me, opp = AI, HUMAN
-    score, mv = minimax_max(board, me, opp, depth, -math.inf, math.inf, player_root=HUMAN)
+def ai_choice(board, depth=3, time_limit=None, workers=None, smp_workers=None, algorithm="alphabeta",
+              aspiration=None):
+    """AI(白=O)の手をミニマックスで選ぶ。time_limit(秒)を指定すると反復深化で時間内に読む。
+    workers を指定すると複数プロセスで、smp_workers を指定すると Lazy SMP（共有メモリの置換表）で並列に読む。
+    algorithm="mtdf" なら深さ固定の探索を MTD(f) で行う（読んだノード数は
+    search.default_searcher().nodes で比べられる）。
+    aspiration（窓の半幅。search.ASPIRATION_WINDOW が目安）を指定すると depth まで反復深化し、
+    各深さを前の値の周りの狭い窓から読む。一緒に使えない指定は ValueError（search.check_choice）"""
+    score, mv = search.choose(board, AI, depth=depth, time_limit=time_limit, workers=workers,
+                              smp_workers=smp_workers, algorithm=algorithm, aspiration=aspiration)
     if mv is None:
-        mvs = valid_moves(board, me)
+        mvs = valid_moves(board, AI)
         if not mvs:
             return None
         # 位置重みで最良
         mv = max(mvs, key=lambda m: POS_WEIGHT[m[0]][m[1]])
     return mv
 
+def print_iteration(searcher, info):
+    """探索の反復ごとの経過（Searcher.hooks に登録する）"""
+    pv = " ".join(str(m) if m is not None else "パス" for m in info["pv"][:6])
+    print(f"  深さ {info['depth']}: 評価値 {info['score']}  {info['nodes']:,} ノード  "
+          f"{info['time']:.2f}s  読み筋 {pv}")
+
 def main():
+    search.default_searcher().hooks.append(print_iteration)
     board = init_board()
     turn = HUMAN  # 先手：人間（黒）
+    history = []  # 打った手。終局したら棋譜ファイルに追記する
     depth = 3     # AIの読み深さ（2～4目安）
 
     print("=== コンソール版オセロ（人間: 黒X / AI: 白O）===\n")
@@ -176,6 +108,7 @@ def main():
                 print("その位置には置けません。合法手から選んでください。\n")
                 continue
             board = make_move(board, x, y, HUMAN)
+            history.append((x, y))
             turn = AI
         else:
             print("AIが思考中…")
@@ -186,11 +119,13 @@ def main():
             else:
                 x, y = mv
                 board = make_move(board, x, y, AI)
-                print(f"AIの手: {(x, y)}\n")
+                history.append((x, y))
+                print(f"AIの手: {(x, y)}（{search.default_searcher().stats_text()}）\n")
                 turn = HUMAN
 
     # ゲーム終了
     print_board(board)
+    record.save_game(history, record.HUMAN, record.ENGINE)
     x_cnt, o_cnt = count_discs(board)
     if x_cnt > o_cnt:
         print("結果：あなたの勝ち！")
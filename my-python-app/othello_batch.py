@@ -0,0 +1,124 @@
+# othello_batch.py
+# 多数の局面をまとめて扱う NumPy 版の合法手生成・着手（自己対戦や解析の一括処理用）
+#
+#   own, opp = from_arrays(boards, side)     # (N, 8, 8) int8 → 手番側/相手の u64 配列
+#   moves = legal_moves(own, opp)            # (N,) の合法手マスク
+#   parent, sq, c_own, c_opp = expand(own, opp)   # 全局面の全合法手の後の局面
+#
+# 局面は othello_engine と同じく「手番側の石」「相手の石」の u64 で持ち、N 局面ぶんを
+# 配列にして8方向のシフトを一度に掛ける。(N, 8, 8) の int8 盤面は 1=黒X, -1=白O, 0=空き。
+# NumPy が要るので othello_engine からは読み込まない。
+
+import numpy as np
+
+from othello_engine import FULL, INNER, INNER_COLS
+
+_U = np.uint64
+SQUARES = np.arange(64, dtype=_U)
+# (シフト量, 相手石に掛けるマスク)。othello_engine.SHIFTS と同じ
+SHIFTS = [(_U(1), _U(INNER_COLS)), (_U(8), _U(FULL)), (_U(7), _U(INNER)), (_U(9), _U(INNER))]
+
+def _u64(a):
+    return np.asarray(a, dtype=_U)
+
+def popcount(bits):
+    if hasattr(np, "bitwise_count"):    # NumPy 2.0 以降
+        return np.bitwise_count(bits).astype(np.int64)
+    return unpack(bits).sum(axis=1, dtype=np.int64)
+
+def unpack(bits):
+    """(N,) の u64 → (N, 64) の 0/1（列 = マス番号）"""
+    b = _u64(bits).astype("<u8").view(np.uint8).reshape(-1, 8)
+    return np.unpackbits(b, axis=1, bitorder="little")
+
+def pack(cells):
+    """(N, 64) の真偽 → (N,) の u64"""
+    return (np.asarray(cells, dtype=_U) << SQUARES).sum(axis=1, dtype=_U)
+
+def from_arrays(boards, side):
+    """(N, 8, 8) の盤面と手番（1=黒X, -1=白O。スカラーか (N,)）→ (手番側の石, 相手の石)"""
+    cells = np.asarray(boards).reshape(-1, 64)
+    side = np.broadcast_to(np.asarray(side, dtype=np.int8), (len(cells),))[:, None]
+    return pack(cells == side), pack(cells == -side)
+
+def to_arrays(own, opp, side):
+    """from_arrays の逆。(N, 8, 8) の int8"""
+    side = np.broadcast_to(np.asarray(side, dtype=np.int8), (len(_u64(own)),))[:, None]
+    cells = unpack(own).astype(np.int8) * side - unpack(opp).astype(np.int8) * side
+    return cells.reshape(-1, 8, 8)
+
+def from_lists(boards):
+    """リスト盤面（"X"/"O"/"."）の並び → (N, 8, 8) の int8"""
+    code = {"X": 1, "O": -1}
+    return np.array([[[code.get(c, 0) for c in row] for row in b] for b in boards], dtype=np.int8)
+
+def legal_moves(own, opp):
+    """各局面の合法手マスク（othello_engine.legal_moves と同じ手順を配列で）"""
+    own, opp = _u64(own), _u64(opp)
+    empty = ~(own | opp)
+    moves = np.zeros_like(own)
+    for s, mask in SHIFTS:
+        o = opp & mask
+        t = o & (own << s)
+        for _ in range(5):
+            t |= o & (t << s)
+        moves |= t << s
+        t = o & (own >> s)
+        for _ in range(5):
+            t |= o & (t >> s)
+        moves |= t >> s
+    return moves & empty
+
+def flips(own, opp, move):
+    """各局面で move（1ビットのマスク）に打ったとき裏返る石。合法でなければ 0"""
+    own, opp, move = _u64(own), _u64(opp), _u64(move)
+    zero = _U(0)
+    f = np.zeros_like(own)
+    for s, mask in SHIFTS:
+        o = opp & mask
+        t = o & (move << s)
+        for _ in range(5):
+            t |= o & (t << s)
+        f |= np.where((t << s) & own, t, zero)
+        t = o & (move >> s)
+        for _ in range(5):
+            t |= o & (t >> s)
+        f |= np.where((t >> s) & own, t, zero)
+    return f
+
+def play(own, opp, sq):
+    """各局面で sq（マス番号）に打った後の (打った側の石, 相手の石)"""
+    move = _U(1) << _u64(sq)
+    f = flips(own, opp, move)
+    return _u64(own) | f | move, _u64(opp) ^ f
+
+def expand(own, opp, moves=None):
+    """全局面の全合法手を打った後の局面を作る。
+    (元の局面の番号, マス番号, 子の手番側の石, 子の相手の石) を返す。子は打たれた側の手番
+    （Position.apply と同じ向き）。合法手のない局面は子を持たない
+    """
+    own, opp = _u64(own), _u64(opp)
+    if moves is None:
+        moves = legal_moves(own, opp)
+    parent, sq = np.nonzero(unpack(moves))
+    mover, other = play(own[parent], opp[parent], sq)
+    return parent, sq, other, mover
+
+def perft(own, opp, depth):
+    """othello_perft.perft と同じ数え方（パスも1手、終局はその場で1）を幅優先で"""
+    own, opp = _u64([own]), _u64([opp])
+    passed = np.zeros(1, dtype=bool)
+    n = 0
+    for d in range(depth, 0, -1):
+        moves = legal_moves(own, opp)
+        count = popcount(moves)
+        stuck = count == 0
+        n += int(np.count_nonzero(stuck & passed))    # 両者パス＝終局
+        if d == 1:
+            return n + int(count.sum()) + int(np.count_nonzero(stuck & ~passed))
+        p = stuck & ~passed
+        _, _, c_own, c_opp = expand(own, opp, moves)
+        # 子の局面と、パスして手番だけ入れ替えた局面が次の深さの対象
+        own, opp = np.concatenate([c_own, opp[p]]), np.concatenate([c_opp, own[p]])
+        passed = np.concatenate([np.zeros(len(c_own), dtype=bool), np.ones(int(p.sum()), dtype=bool)])
+    return n
@@ -0,0 +1,137 @@
+# othello_bench.py
+# 探索のベンチマーク：決まった局面集を決まった深さ・持ち時間で読み、
+# ノード数・nodes/s・置換表ヒット率・βカット率・時間・選んだ手を表示する。
+#
+#   python othello_bench.py                       # 深さ固定（既定 6）
+#   python othello_bench.py --time 1.0            # 1局面 1 秒の反復深化
+#   python othello_bench.py --json bench.json     # 結果を JSON でも書き出す
+#
+# 局面は毎回新しい Searcher で読むので、置換表の持ち越しで結果が変わらない。
+
+import argparse
+import json
+import sys
+import time
+
+from othello_engine import Position, square
+from othello_search import Searcher
+import othello_pattern as pattern
+import othello_probcut as mpc
+
+# (名前, 種類, 初期盤面からの棋譜)。棋譜は列 a〜h + 行 1〜8 の並びで、パスは書かない
+POSITIONS = [
+    ("start",      "opening", ""),
+    ("tiger",      "opening", "f5d6c3d3c4"),
+    ("open-10",    "opening", "c4c5b6d3c2a7c6d6c7b7"),
+    ("mid-20",     "midgame", "c4c5b6d3c2a7c6d6c7b7e7f3a6b8f5c3b5c1a8g6"),
+    ("mid-26",     "midgame", "d3c3b3e3f3c5f6d2e1a3b4b5c6d7c4c2a5f4g4e6e8g6d6h4h6f2"),
+    ("mid-32",     "midgame", "c4c5f6c3b5g7c2b2e3c6c7a5h8c8a1c1b4f2d2e1a6a7b7a2e2d6e6d7b8a8e8d8"),
+    ("end-16",     "endgame", "c4c5b6d3c2a7c6d6c7b7e7f3a6b8f5c3b5c1a8g6f4f6e3f8g5g3h3h6b3d2e6a3"
+                              "f7d7e2g8d1a4h4e1f1g1e8d8"),
+    ("end-12",     "endgame", "d3c3b3e3f3c5f6d2e1a3b4b5c6d7c4c2a5f4g4e6e8g6d6h4h6f2a2a1g1e7f5g5"
+                              "f7c8c1f1h5h1h3f8g3d8c7a4a6a7b6b2"),
+    ("end-10",     "endgame", "c4c5f6c3b5g7c2b2e3c6c7a5h8c8a1c1b4f2d2e1a6a7b7a2e2d6e6d7b8a8e8d8"
+                              "b6f8a4d3b3h6e7a3d1f3f4f1g3h4h3g4f5g5"),
+]
+
+def parse_square(s):
+    """'f5' → マス番号（行 = 数字, 列 = 英字）"""
+    return square(int(s[1]) - 1, "abcdefgh".index(s[0]))
+
+def notation(mv):
+    x, y = mv
+    return "abcdefgh"[y] + str(x + 1)
+
+def replay(transcript):
+    """棋譜を初期盤面から並べた (盤面, 手番)。置けない側は自動でパスする"""
+    pos = Position.initial()
+    for i in range(0, len(transcript), 2):
+        sq = parse_square(transcript[i:i+2])
+        if not pos.moves():
+            pos.pass_turn()
+        if not (pos.moves() >> sq) & 1:
+            raise ValueError(f"棋譜の {i // 2 + 1} 手目 {transcript[i:i+2]} は打てません")
+        pos.apply(sq)
+    if not pos.moves() and pos.opponent_moves():
+        pos.pass_turn()
+    return pos.to_board(), pos.player
+
+def run_one(name, kind, transcript, depth, time_limit, make_searcher):
+    board, player = replay(transcript)
+    searcher = make_searcher()
+    start = time.perf_counter()
+    if time_limit is not None:
+        score, mv, reached = searcher.search_timed(board, player, time_limit)
+    else:
+        score, mv = searcher.search(board, player, depth)
+        empties = sum(r.count(".") for r in board)
+        # 終盤は完全読みなので最後まで読んでいる
+        reached = empties if empties <= searcher.endgame_empties else depth
+    took = time.perf_counter() - start
+    st = searcher.stats
+    return {
+        "name": name, "kind": kind, "empties": sum(r.count(".") for r in board),
+        "depth": reached, "move": notation(mv) if mv is not None else None, "score": score,
+        "nodes": searcher.nodes, "time": took, "nps": searcher.nodes / took if took > 0 else 0.0,
+        "tt_hit_rate": st.tt_hit_rate, "cutoff_rate": st.cutoff_rate,
+        "first_move_cutoff_rate": st.first_move_cutoff_rate,
+        "iterations": [{"depth": it["depth"], "score": it["score"], "nodes": it["nodes"],
+                        "time": it["time"]} for it in st.iterations],
+    }
+
+def run(depth=6, time_limit=None, make_searcher=Searcher, kinds=None):
+    results = []
+    for name, kind, transcript in POSITIONS:
+        if kinds and kind not in kinds:
+            continue
+        results.append(run_one(name, kind, transcript, depth, time_limit, make_searcher))
+    return results
+
+def print_table(results, fp=sys.stdout):
+    print(f"{'position':10s} {'kind':8s} {'empty':>5s} {'depth':>5s} {'move':>4s} {'score':>7s} {'nodes':>10s} "
+          f"{'time(s)':>8s} {'nodes/s':>9s} {'tt-hit':>8s} {'cutoff':>8s}", file=fp)
+    for r in results:
+        print(f"{r['name']:10s} {r['kind']:8s} {r['empties']:5d} {r['depth']:5d} {r['move'] or '--':>4s} "
+              f"{r['score']:7} {r['nodes']:10,d} {r['time']:8.3f} {r['nps']:9,.0f} "
+              f"{r['tt_hit_rate']:8.1%} {r['cutoff_rate']:8.1%}", file=fp)
+    nodes = sum(r["nodes"] for r in results)
+    took = sum(r["time"] for r in results)
+    print(f"合計 {nodes:,} ノード, {took:.2f}s, {nodes / took if took else 0:,.0f} nodes/s", file=fp)
+
+def main():
+    ap = argparse.ArgumentParser(description="探索のベンチマーク")
+    ap.add_argument("--depth", type=int, default=6, help="深さ固定で読む深さ")
+    ap.add_argument("--time", type=float, default=None, help="指定すると1局面あたりこの秒数の反復深化")
+    ap.add_argument("--kind", action="append", choices=["opening", "midgame", "endgame"],
+                    help="この種類の局面だけ読む（複数指定可）")
+    ap.add_argument("--weights", help="パターン重み（省略時は位置重み評価）")
+    ap.add_argument("--selectivity", type=int, default=0, help="Multi-ProbCut の選択性レベル")
+    ap.add_argument("--probcut", metavar="PATH",
+                    help="ProbCut の係数ファイル（--weights と使うときはその重みで fit したもの）")
+    ap.add_argument("--json", metavar="PATH", help="結果を JSON で書き出す（- なら標準出力）")
+    args = ap.parse_args()
+
+    try:
+        evaluator = pattern.load_evaluator(args.weights) if args.weights else None
+        probcut = mpc.load_probcut(args.selectivity, args.probcut, args.weights)
+    except (OSError, ValueError) as e:
+        ap.error(str(e))
+
+    def make_searcher():
+        return Searcher(evaluator=evaluator, probcut=probcut)
+
+    results = run(args.depth, args.time, make_searcher, args.kind)
+    if args.json != "-":
+        print_table(results)
+    if args.json:
+        report = {"depth": args.depth, "time_limit": args.time, "selectivity": args.selectivity,
+                  "weights": args.weights, "results": results}
+        if args.json == "-":
+            json.dump(report, sys.stdout, indent=1)
+            print()
+        else:
+            with open(args.json, "w") as fp:
+                json.dump(report, fp, indent=1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# othello_book.py
+# 定跡（局面 → 各手の評価値）。盤面の8つの対称形は1つの局面として引く。
+#
+#   python othello_book.py build Resources/opening_book.bin --games 200 --plies 10 --depth 4
+#   python othello_book.py show Resources/opening_book.bin
+#
+# 局面は8つの対称形のうち (自分, 相手) が最小になるものを正規形とし、
+# その Zobrist ハッシュをキーにする。手も正規形の座標で持ち、引くときに元へ戻す。
+# ファイルはキー順に並べた固定長レコードで、読み込んだら dict で引く。
+
+import argparse
+import os
+import random
+import struct
+import sys
+import time
+
+from othello_engine import (SYMMETRY_INVERSE, SYMMETRY_MAPS, Position, board_to_bits,
+                            coords, iter_bits, popcount, transform, zobrist)
+from othello_search import Searcher
+import othello_pattern as pattern
+
+MAGIC = b"OTBK"
+VERSION = 1
+HEADER = struct.Struct("<4sHHI")   # MAGIC, VERSION, 最大石数, レコード数
+RECORD = struct.Struct("<QBh")     # キー, 手(正規形のマス番号), 評価値(手番側視点)
+DEFAULT_BOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "Resources", "opening_book.bin")
+
+def canonical(own, opp):
+    """(キー, 対称変換の番号) を返す"""
+    best, best_k = None, 0
+    for k in range(len(SYMMETRY_MAPS)):
+        t = (transform(own, k), transform(opp, k))
+        if best is None or t < best:
+            best, best_k = t, k
+    return zobrist(best[0], best[1], "X"), best_k
+
+class OpeningBook:
+    """entries[キー] = [(正規形のマス番号, 評価値), ...]"""
+
+    def __init__(self, entries=None, max_discs=0):
+        self.entries = entries if entries is not None else {}
+        # これより石の多い局面は定跡にないので、正規化せずに抜ける
+        self.max_discs = max_discs
+
+    def __len__(self):
+        return len(self.entries)
+
+    def scores(self, own, opp):
+        """手番側の各手の評価値 [(マス番号, 評価値), ...]。定跡になければ None"""
+        if popcount(own | opp) > self.max_discs:
+            return None
+        key, k = canonical(own, opp)
+        e = self.entries.get(key)
+        if e is None:
+            return None
+        inv = SYMMETRY_INVERSE[k]
+        return [(inv[sq], sc) for sq, sc in e]
+
+    def add(self, own, opp, scores):
+        key, k = canonical(own, opp)
+        m = SYMMETRY_MAPS[k]
+        self.entries[key] = [(m[sq], sc) for sq, sc in scores]
+        self.max_discs = max(self.max_discs, popcount(own | opp))
+
+    def best_move(self, own, opp):
+        """定跡の最善手（マス番号）。なければ None"""
+        sc = self.scores(own, opp)
+        if not sc:
+            return None
+        return max(sc, key=lambda t: t[1])[0]
+
+    def probe(self, board, player):
+        """リスト盤面で引く。(x, y) or None"""
+        own, opp = board_to_bits(board, player)
+        sq = self.best_move(own, opp)
+        return coords(sq) if sq is not None else None
+
+    def save(self, path):
+        with open(path, "wb") as fp:
+            n = sum(len(e) for e in self.entries.values())
+            fp.write(HEADER.pack(MAGIC, VERSION, self.max_discs, n))
+            for key in sorted(self.entries):
+                for sq, sc in self.entries[key]:
+                    fp.write(RECORD.pack(key, sq, max(-32768, min(32767, sc))))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as fp:
+            magic, version, max_discs, n = HEADER.unpack(fp.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"定跡ファイルの形式が違います: {path}")
+            data = fp.read(RECORD.size * n)
+        if len(data) != RECORD.size * n:
+            raise ValueError(f"定跡ファイルが途中で切れています: {path}")
+        entries = {}
+        for key, sq, sc in RECORD.iter_unpack(data):
+            entries.setdefault(key, []).append((sq, sc))
+        return cls(entries, max_discs)
+
+def load_book(path=DEFAULT_BOOK, missing_ok=False):
+    """定跡ファイルを読む。missing_ok=True ならファイルがなければ None"""
+    if missing_ok and not os.path.exists(path):
+        return None
+    return OpeningBook.load(path)
+
+# --- 自己対戦で定跡を広げる ---
+
+def score_moves(searcher, pos, depth):
+    """pos の各合法手を depth 手読みで評価する（手番側視点）"""
+    scores = []
+    for sq in iter_bits(pos.moves()):
+        child = pos.copy()
+        child.apply(sq)
+        sc, _ = searcher.search(child.to_board(), child.player, max(1, depth - 1))
+        scores.append((sq, -int(sc)))
+    return scores
+
+def expand(book, searcher, rng, games, plies, depth, margin):
+    """自己対戦で定跡を広げる。定跡の手のうち最善から margin 以内の手をランダムに選んで進め、
+    定跡にない局面に来たら全合法手を読んで登録する。追加した局面数を返す
+    """
+    added = 0
+    for g in range(games):
+        pos = Position.initial()
+        for _ in range(plies):
+            if not pos.moves():
+                if not pos.opponent_moves():
+                    break
+                pos.pass_turn()
+                continue
+            scores = book.scores(pos.own, pos.opp)
+            if scores is None:
+                scores = score_moves(searcher, pos, depth)
+                book.add(pos.own, pos.opp, scores)
+                added += 1
+            best = max(sc for _, sc in scores)
+            sq = rng.choice([sq for sq, sc in scores if sc >= best - margin])
+            pos.apply(sq)
+        if (g + 1) % 10 == 0:
+            print(f"{g + 1} 局 / {len(book)} 局面", file=sys.stderr)
+    return added
+
+def cmd_build(args):
+    book = load_book(args.book, missing_ok=True) or OpeningBook()
+    evaluator = pattern.load_evaluator(args.weights) if args.weights else None
+    searcher = Searcher(evaluator=evaluator)
+    start = time.time()
+    added = expand(book, searcher, random.Random(args.seed), args.games, args.plies,
+                   args.depth, args.margin)
+    book.save(args.book)
+    print(f"{added} 局面を追加、{len(book)} 局面を {args.book} に書きました"
+          f"（{time.time() - start:.0f}s）")
+
+def cmd_show(args):
+    book = load_book(args.book)
+    n = sum(len(e) for e in book.entries.values())
+    print(f"{len(book)} 局面, {n} 手, 石数 {book.max_discs} まで")
+    pos = Position.initial()
+    for sq, sc in sorted(book.scores(pos.own, pos.opp) or [], key=lambda t: -t[1]):
+        print(f"  初手 {coords(sq)}: {sc}")
+
+def main():
+    ap = argparse.ArgumentParser(description="オセロの定跡")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("build", help="自己対戦で定跡を作る・広げる")
+    p.add_argument("book", help="定跡ファイル（あれば追記）")
+    p.add_argument("--games", type=int, default=100)
+    p.add_argument("--plies", type=int, default=10, help="何手目まで定跡にするか")
+    p.add_argument("--depth", type=int, default=4, help="各手を評価する読みの深さ")
+    p.add_argument("--margin", type=int, default=64, help="最善からこの差までの手も打って広げる")
+    p.add_argument("--weights", help="評価に使うパターン重み（省略時は位置重み評価）")
+    p.add_argument("--seed", type=int, default=None)
+    p.set_defaults(func=cmd_build)
+
+    p = sub.add_parser("show", help="定跡の概要を表示する")
+    p.add_argument("book")
+    p.set_defaults(func=cmd_show)
+
+    args = ap.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
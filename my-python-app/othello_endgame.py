@@ -0,0 +1,246 @@
+# othello_endgame.py
+# 終盤の完全読み。評価関数を使わず、最終石差（手番側視点）を返す。
+
+from othello_engine import (FULL, ZOBRIST_SIDE, ZOBRIST_SQ, _ZOBRIST_FLIP, _hash_bits, flips,
+                            iter_bits, legal_moves, opponent_of, popcount)
+from othello_tt import EXACT, LOWER, UPPER, TranspositionTable
+
+DEFAULT_ENDGAME_EMPTIES = 12   # 空きがこれ以下なら完全読みに切り替える
+SHALLOW_EMPTIES = 4            # これ以下は合法手生成をせず空きマスを直接試す
+FASTEST_FIRST_EMPTIES = 7      # これ以上は相手の着手数が少ない手から読む
+TT_MIN_EMPTIES = 9             # これ以上のノードだけ置換表を使う
+CHECK_INTERVAL = 256           # 何ノードごとに check を呼ぶか
+SCORE_INF = 65
+
+# 4象限（左上, 右上, 左下, 右下）
+QUADRANTS = [0x000000000F0F0F0F, 0x00000000F0F0F0F0,
+             0x0F0F0F0F00000000, 0xF0F0F0F000000000]
+QUADRANT_OF = [(sq // 32) * 2 + (sq % 8) // 4 for sq in range(64)]
+
+def final_score(own, opp):
+    """終局時の石差（空きマスは勝った側に数える）"""
+    n_own, n_opp = popcount(own), popcount(opp)
+    diff = n_own - n_opp
+    if diff > 0:
+        return 64 - 2*n_opp
+    if diff < 0:
+        return 2*n_own - 64
+    return 0
+
+def child_hash(h, player, sq, f):
+    """player が sq に打って f を返した後の Zobrist ハッシュ（Position.apply と同じ更新）"""
+    return h ^ ZOBRIST_SQ[player][sq] ^ _hash_bits(f, _ZOBRIST_FLIP) ^ ZOBRIST_SIDE
+
+def odd_quadrants(empty):
+    """空きが奇数個の象限のマスク（パリティ）"""
+    m = 0
+    for q in QUADRANTS:
+        if popcount(empty & q) & 1:
+            m |= q
+    return m
+
+def parity_order(empty):
+    """空きマスを、奇数個の象限にあるものから順に並べる"""
+    odd = odd_quadrants(empty)
+    return list(iter_bits(empty & odd)) + list(iter_bits(empty & ~odd))
+
+def last1(own, opp, sq):
+    """残り1マス"""
+    diff = popcount(own) - popcount(opp)
+    n = popcount(flips(own, opp, sq))
+    if n:
+        return diff + 2*n + 1
+    n = popcount(flips(opp, own, sq))
+    if n:
+        return diff - 2*n - 1
+    # どちらも置けない：空きは勝った側
+    if diff > 0:
+        return diff + 1
+    if diff < 0:
+        return diff - 1
+    return 0
+
+def last2(own, opp, alpha, beta, sq1, sq2, passed=False):
+    """残り2マス（どちらを打っても残りは last1）"""
+    best = -SCORE_INF
+    f = flips(own, opp, sq1)
+    if f:
+        best = -last1(opp ^ f, own | f | (1 << sq1), sq2)
+        if best >= beta:
+            return best
+    f = flips(own, opp, sq2)
+    if f:
+        v = -last1(opp ^ f, own | f | (1 << sq2), sq1)
+        if v > best:
+            best = v
+    if best == -SCORE_INF:
+        if passed:
+            return final_score(own, opp)
+        return -last2(opp, own, -beta, -alpha, sq1, sq2, True)
+    return best
+
+def last3(own, opp, alpha, beta, sq1, sq2, sq3, passed=False):
+    """残り3マス。sq1 から順に読む"""
+    best = -SCORE_INF
+    for sq, a, b in ((sq1, sq2, sq3), (sq2, sq1, sq3), (sq3, sq1, sq2)):
+        f = flips(own, opp, sq)
+        if not f:
+            continue
+        v = -last2(opp ^ f, own | f | (1 << sq), -beta, -alpha, a, b)
+        if v > best:
+            best = v
+            if v > alpha:
+                alpha = v
+                if alpha >= beta:
+                    return best
+    if best == -SCORE_INF:
+        if passed:
+            return final_score(own, opp)
+        return -last3(opp, own, -beta, -alpha, sq1, sq2, sq3, True)
+    return best
+
+def last4(own, opp, alpha, beta, sq1, sq2, sq3, sq4, passed=False):
+    """残り4マス。sq1 から順に読む"""
+    best = -SCORE_INF
+    for sq, a, b, c in ((sq1, sq2, sq3, sq4), (sq2, sq1, sq3, sq4),
+                        (sq3, sq1, sq2, sq4), (sq4, sq1, sq2, sq3)):
+        f = flips(own, opp, sq)
+        if not f:
+            continue
+        v = -last3(opp ^ f, own | f | (1 << sq), -beta, -alpha, a, b, c)
+        if v > best:
+            best = v
+            if v > alpha:
+                alpha = v
+                if alpha >= beta:
+                    return best
+    if best == -SCORE_INF:
+        if passed:
+            return final_score(own, opp)
+        return -last4(opp, own, -beta, -alpha, sq1, sq2, sq3, sq4, True)
+    return best
+
+def solve_shallow(own, opp, alpha, beta, squares):
+    """残り4マス以下。squares は空きマスのリスト（パリティ順）"""
+    n = len(squares)
+    if n == 4:
+        return last4(own, opp, alpha, beta, *squares)
+    if n == 3:
+        return last3(own, opp, alpha, beta, *squares)
+    if n == 2:
+        return last2(own, opp, alpha, beta, *squares)
+    if n == 1:
+        return last1(own, opp, squares[0])
+    return final_score(own, opp)
+
+class EndgameSolver:
+    """αβ（fail-soft）の完全読み。wld=True なら勝ち/負け/引き分けだけを読む。
+    check を渡すと CHECK_INTERVAL ノードごとに呼ぶ（例外を投げて読みを打ち切らせる）
+    """
+
+    def __init__(self, tt_mb=4, check=None):
+        self.tt = TranspositionTable(tt_mb)
+        self.nodes = 0
+        self.check = check
+
+    def solve(self, own, opp, h, player, alpha, beta, passed=False):
+        """h は (own, opp, player) の Zobrist ハッシュ（置換表のキー。Position.hash と同じ値）"""
+        self.nodes += 1
+        if self.check is not None and self.nodes % CHECK_INTERVAL == 0:
+            self.check()
+        empty = ~(own | opp) & FULL
+        n_empty = popcount(empty)
+        if n_empty <= SHALLOW_EMPTIES:
+            return solve_shallow(own, opp, alpha, beta, parity_order(empty))
+        moves = legal_moves(own, opp)
+        if not moves:
+            if passed:
+                return final_score(own, opp)
+            return -self.solve(opp, own, h ^ ZOBRIST_SIDE, opponent_of(player), -beta, -alpha, True)
+
+        key = hash_move = None
+        if n_empty >= TT_MIN_EMPTIES:
+            key = h
+            e = self.tt.probe(key)
+            if e is not None:
+                hash_move = e[4]
+                sc, bound = e[3], e[2]
+                if bound == EXACT:
+                    return sc
+                if bound == LOWER and sc > alpha:
+                    alpha = sc
+                elif bound == UPPER and sc < beta:
+                    beta = sc
+                if alpha >= beta:
+                    return sc
+
+        alpha0 = alpha
+        best, best_move = -SCORE_INF, None
+        other = opponent_of(player)
+        child_tt = n_empty - 1 >= TT_MIN_EMPTIES  # 子で置換表を引かないならハッシュの更新も省く
+        for sq, f in self.order(own, opp, moves, empty, n_empty, hash_move):
+            ch = child_hash(h, player, sq, f) if child_tt else 0
+            v = -self.solve(opp ^ f, own | f | (1 << sq), ch, other, -beta, -alpha)
+            if v > best:
+                best, best_move = v, sq
+                if v > alpha:
+                    alpha = v
+                    if alpha >= beta:
+                        break
+
+        if key is not None:
+            if best >= beta:
+                bound = LOWER
+            elif best > alpha0:
+                bound = EXACT
+            else:
+                bound = UPPER
+            self.tt.store(key, n_empty, bound, best, best_move)
+        return best
+
+    def order(self, own, opp, moves, empty, n_empty, hash_move=None):
+        """着手順：置換表の手 → (空きが多いとき) 相手の着手数が少ない順 → パリティ"""
+        odd = odd_quadrants(empty)
+        children = []
+        for sq in iter_bits(moves):
+            f = flips(own, opp, sq)
+            if sq == hash_move:
+                key = -1
+            elif n_empty >= FASTEST_FIRST_EMPTIES:
+                new_own = opp ^ f
+                key = popcount(legal_moves(new_own, own | f | (1 << sq))) * 2
+                key += 0 if (odd >> sq) & 1 else 1
+            else:
+                key = 0 if (odd >> sq) & 1 else 1
+            children.append((key, sq, f))
+        children.sort()
+        return [(sq, f) for _, sq, f in children]
+
+    def solve_root(self, pos, wld=False):
+        """pos の手番側の最善手と最終石差を返す (石差, マス番号 or None)。
+        wld=True なら石差の代わりに 1/0/-1（勝ち/引き分け/負け）を返す
+        """
+        self.tt.new_search()
+        self.nodes = 0
+        own, opp = pos.own, pos.opp
+        lo, hi = (-1, 1) if wld else (-SCORE_INF, SCORE_INF)
+        moves = legal_moves(own, opp)
+        if not moves:
+            v = self.solve(own, opp, pos.hash, pos.player, lo, hi)
+            return (max(-1, min(1, v)) if wld else v), None
+        empty = ~(own | opp) & FULL
+        alpha, best_move = lo, None
+        best = -SCORE_INF
+        other = opponent_of(pos.player)
+        for sq, f in self.order(own, opp, moves, empty, popcount(empty)):
+            ch = child_hash(pos.hash, pos.player, sq, f)
+            v = -self.solve(opp ^ f, own | f | (1 << sq), ch, other, -hi, -alpha)
+            if v > best:
+                best, best_move = v, sq
+                if v > alpha:
+                    alpha = v
+                    if alpha >= hi:
+                        break
+        if wld:
+            return max(-1, min(1, best)), best_move
+        return best, best_move
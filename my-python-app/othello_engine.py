@@ -0,0 +1,276 @@
+# othello_engine.py
+# ビットボード版オセロの共通エンジン
+# 盤面を「手番側の石」「相手の石」の2つの64bit整数で表す。
+# マス (x, y) はビット x*8 + y に対応（x=行, y=列。既存の board[x][y] と同じ向き）。
+
+import random
+
+BOARD_SIZE = 8
+EMPTY = "."
+
+FULL = 0xFFFFFFFFFFFFFFFF
+# 左右の端列を除いたマスク（横・斜め方向の回り込み防止）
+INNER_COLS = 0x7E7E7E7E7E7E7E7E
+# 上下左右の端を除いたマスク（斜め方向用）
+INNER = 0x007E7E7E7E7E7E00
+
+# (シフト量, 相手石に掛けるマスク)。左シフトと右シフトの両方で使う
+SHIFTS = [(1, INNER_COLS), (8, FULL), (7, INNER), (9, INNER)]
+
+# Zobrist ハッシュ用の乱数（再現性のため固定シード）
+_rng = random.Random(20240611)
+ZOBRIST_SQ = {c: [_rng.getrandbits(64) for _ in range(64)] for c in ("X", "O")}
+ZOBRIST_SIDE = _rng.getrandbits(64)  # 白番のとき XOR する
+
+def _byte_tables(keys):
+    """8ビットずつまとめて引けるように、バイト位置×値ごとの XOR を前計算"""
+    tables = []
+    for i in range(8):
+        t = [0]*256
+        for v in range(1, 256):
+            low = v & -v
+            t[v] = t[v ^ low] ^ keys[i*8 + low.bit_length() - 1]
+        tables.append(t)
+    return tables
+
+_ZOBRIST_BYTES = {c: _byte_tables(ZOBRIST_SQ[c]) for c in ("X", "O")}
+# 裏返し（黒⇔白の入れ替え）は両色のキーの XOR で一度に更新できる
+_ZOBRIST_FLIP = _byte_tables([a ^ b for a, b in zip(ZOBRIST_SQ["X"], ZOBRIST_SQ["O"])])
+
+def _hash_bits(bits, tables):
+    h = 0
+    i = 0
+    while bits:
+        h ^= tables[i][bits & 0xFF]
+        bits >>= 8
+        i += 1
+    return h
+
+def zobrist(own, opp, player):
+    """局面全体の Zobrist ハッシュ（探索中は Position が差分更新する）"""
+    other = opponent_of(player)
+    h = _hash_bits(own, _ZOBRIST_BYTES[player]) ^ _hash_bits(opp, _ZOBRIST_BYTES[other])
+    return h ^ ZOBRIST_SIDE if player == "O" else h
+
+def _rays(sq):
+    """sq から8方向に伸びる半直線（長さ2以上のもの）をビットの並びで返す"""
+    x, y = divmod(sq, BOARD_SIZE)
+    rays = []
+    for dx, dy in [(-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1)]:
+        ray = []
+        nx, ny = x + dx, y + dy
+        while 0 <= nx < BOARD_SIZE and 0 <= ny < BOARD_SIZE:
+            ray.append(1 << (nx*BOARD_SIZE + ny))
+            nx += dx; ny += dy
+        if len(ray) >= 2:
+            rays.append(tuple(ray))
+    return tuple(rays)
+
+# 裏返し計算用：マスごとの8方向の半直線
+RAYS = [_rays(sq) for sq in range(64)]
+
+# 盤面の8つの対称変換（マス (x, y) の移し先）。0 番は恒等変換
+_SYMMETRY_XY = [
+    lambda x, y: (x, y),
+    lambda x, y: (x, 7 - y),
+    lambda x, y: (7 - x, y),
+    lambda x, y: (7 - x, 7 - y),
+    lambda x, y: (y, x),
+    lambda x, y: (y, 7 - x),
+    lambda x, y: (7 - y, x),
+    lambda x, y: (7 - y, 7 - x),
+]
+
+def _symmetry_map(f):
+    m = []
+    for sq in range(64):
+        x, y = f(*divmod(sq, BOARD_SIZE))
+        m.append(x*BOARD_SIZE + y)
+    return m
+
+# SYMMETRY_MAPS[k][sq] = 対称変換 k で sq が移るマス
+SYMMETRY_MAPS = [_symmetry_map(f) for f in _SYMMETRY_XY]
+# SYMMETRY_INVERSE[k] は SYMMETRY_MAPS[k] の逆（変換後のマスから元のマスへ）
+SYMMETRY_INVERSE = [[m.index(sq) for sq in range(64)] for m in SYMMETRY_MAPS]
+# ビットボード全体の変換もバイト単位の表で引く（移った先のビットの OR = XOR）
+_SYMMETRY_BYTES = [_byte_tables([1 << t for t in m]) for m in SYMMETRY_MAPS]
+
+def transform(bits, k):
+    """ビットボードに対称変換 k をかける"""
+    return _hash_bits(bits, _SYMMETRY_BYTES[k])
+
+def opponent_of(player):
+    return "O" if player == "X" else "X"
+
+def square(x, y):
+    return x*BOARD_SIZE + y
+
+def coords(sq):
+    return divmod(sq, BOARD_SIZE)
+
+def popcount(b):
+    return b.bit_count()
+
+def iter_bits(b):
+    """立っているビットのマス番号を小さい順に返す"""
+    while b:
+        low = b & -b
+        yield low.bit_length() - 1
+        b ^= low
+
+def board_to_bits(board, player):
+    """リスト盤面 → (player の石, 相手の石)"""
+    opp = opponent_of(player)
+    own = other = 0
+    bit = 1
+    for row in board:
+        for v in row:
+            if v == player:
+                own |= bit
+            elif v == opp:
+                other |= bit
+            bit <<= 1
+    return own, other
+
+def bits_to_board(own, opp, player):
+    """(player の石, 相手の石) → リスト盤面"""
+    other = opponent_of(player)
+    board = []
+    bit = 1
+    for _ in range(BOARD_SIZE):
+        row = []
+        for _ in range(BOARD_SIZE):
+            if own & bit:
+                row.append(player)
+            elif opp & bit:
+                row.append(other)
+            else:
+                row.append(EMPTY)
+            bit <<= 1
+        board.append(row)
+    return board
+
+def initial_bits():
+    """初期盤面（黒X番）の (黒, 白)"""
+    black = (1 << square(3, 4)) | (1 << square(4, 3))
+    white = (1 << square(3, 3)) | (1 << square(4, 4))
+    return black, white
+
+def legal_moves(own, opp):
+    """合法手のビットマスク（シフトとマスクで8方向を同時に調べる）"""
+    empty = ~(own | opp) & FULL
+    moves = 0
+    for s, mask in SHIFTS:
+        o = opp & mask
+        # 左シフト方向
+        t = o & (own << s)
+        t |= o & (t << s)
+        t |= o & (t << s)
+        t |= o & (t << s)
+        t |= o & (t << s)
+        t |= o & (t << s)
+        moves |= (t << s)
+        # 右シフト方向
+        t = o & (own >> s)
+        t |= o & (t >> s)
+        t |= o & (t >> s)
+        t |= o & (t >> s)
+        t |= o & (t >> s)
+        t |= o & (t >> s)
+        moves |= (t >> s)
+    return moves & empty
+
+def flips(own, opp, sq):
+    """sq に打ったときに裏返る石のビットマスク（合法でなければ 0）"""
+    f = 0
+    for ray in RAYS[sq]:
+        # 隣が相手の石でない方向はすぐ捨てる
+        if not opp & ray[0]:
+            continue
+        line = ray[0]
+        for b in ray[1:]:
+            if opp & b:
+                line |= b
+            else:
+                if own & b:
+                    f |= line
+                break
+    return f
+
+def play(own, opp, sq):
+    """sq に打った後の (打った側の石, 相手の石) を返す"""
+    f = flips(own, opp, sq)
+    return own | f | (1 << sq), opp ^ f
+
+def moves_to_list(mask):
+    """合法手マスク → [(x, y), ...]（左上から順）"""
+    return [coords(sq) for sq in iter_bits(mask)]
+
+def valid_moves(board, player):
+    """リスト盤面用：有効な手をリストで返す"""
+    own, opp = board_to_bits(board, player)
+    return moves_to_list(legal_moves(own, opp))
+
+def flipped_squares(board, x, y, player):
+    """リスト盤面用：(x, y) に打ったとき裏返る座標のリスト"""
+    own, opp = board_to_bits(board, player)
+    return [coords(sq) for sq in iter_bits(flips(own, opp, square(x, y)))]
+
+class Position:
+    """探索用の局面。apply/undo でその場更新し、盤面コピーを作らない"""
+
+    def __init__(self, own, opp, player="X"):
+        self.own = own          # 手番側の石
+        self.opp = opp          # 相手の石
+        self.player = player    # 手番（"X" / "O"）
+        self.hash = zobrist(own, opp, player)
+
+    @classmethod
+    def from_board(cls, board, player):
+        own, opp = board_to_bits(board, player)
+        return cls(own, opp, player)
+
+    @classmethod
+    def initial(cls):
+        black, white = initial_bits()
+        return cls(black, white, "X")
+
+    def to_board(self):
+        return bits_to_board(self.own, self.opp, self.player)
+
+    def copy(self):
+        pos = object.__new__(type(self))
+        pos.__dict__.update(self.__dict__)
+        return pos
+
+    def moves(self):
+        return legal_moves(self.own, self.opp)
+
+    def opponent_moves(self):
+        return legal_moves(self.opp, self.own)
+
+    def is_game_over(self):
+        return not self.moves() and not self.opponent_moves()
+
+    def empties(self):
+        return 64 - popcount(self.own | self.opp)
+
+    def apply(self, sq):
+        """sq に打って手番を交代する。戻り値の裏返しマスクを undo に渡すと元に戻る"""
+        f = flips(self.own, self.opp, sq)
+        self.own, self.opp = self.opp ^ f, self.own | f | (1 << sq)
+        self.hash ^= ZOBRIST_SQ[self.player][sq] ^ _hash_bits(f, _ZOBRIST_FLIP) ^ ZOBRIST_SIDE
+        self.player = opponent_of(self.player)
+        return f
+
+    def undo(self, sq, f):
+        """apply(sq) が返した裏返しマスク f を使って一手戻す"""
+        self.own, self.opp = self.opp ^ f ^ (1 << sq), self.own | f
+        self.player = opponent_of(self.player)
+        self.hash ^= ZOBRIST_SQ[self.player][sq] ^ _hash_bits(f, _ZOBRIST_FLIP) ^ ZOBRIST_SIDE
+
+    def pass_turn(self):
+        """パス（もう一度呼ぶと元に戻る）"""
+        self.own, self.opp = self.opp, self.own
+        self.player = opponent_of(self.player)
+        self.hash ^= ZOBRIST_SIDE
@@ -0,0 +1,84 @@
+# othello_eval.py
+# 評価関数（ビットボード版）
+
+from othello_engine import Position, legal_moves, popcount
+
+# 角重視の位置評価（角=高、辺=中、隅の隣=低）
+POS_WEIGHT = [
+    [120,-20, 20,  5,  5, 20,-20,120],
+    [-20,-40, -5, -5, -5, -5,-40,-20],
+    [ 20, -5, 15,  3,  3, 15, -5, 20],
+    [  5, -5,  3,  3,  3,  3, -5,  5],
+    [  5, -5,  3,  3,  3,  3, -5,  5],
+    [ 20, -5, 15,  3,  3, 15, -5, 20],
+    [-20,-40, -5, -5, -5, -5,-40,-20],
+    [120,-20, 20,  5,  5, 20,-20,120],
+]
+
+# マス番号で引ける一次元版
+SQ_WEIGHT = [w for row in POS_WEIGHT for w in row]
+
+def _byte_weights():
+    """8ビットずつまとめて位置重みの和を引く表（バイト位置×値）"""
+    tables = []
+    for i in range(8):
+        t = [0]*256
+        for v in range(1, 256):
+            low = v & -v
+            t[v] = t[v ^ low] + SQ_WEIGHT[i*8 + low.bit_length() - 1]
+        tables.append(t)
+    return tables
+
+_BYTE_WEIGHT = _byte_weights()
+
+def positional(bits):
+    """bits に立っているマスの位置重みの和"""
+    s = 0
+    i = 0
+    while bits:
+        s += _BYTE_WEIGHT[i][bits & 0xFF]
+        bits >>= 8
+        i += 1
+    return s
+
+class EvalPosition(Position):
+    """位置重みの差（手番側 - 相手）を apply/undo のたびに差分で更新する局面。
+    打ったマスと裏返った石の分だけ足し引きするので、葉で64マスを数え直さない
+    """
+
+    def __init__(self, own, opp, player="X"):
+        super().__init__(own, opp, player)
+        self.pos_score = positional(own) - positional(opp)
+
+    def apply(self, sq):
+        f = Position.apply(self, sq)
+        # 裏返った石は相手から自分へ移るので2倍効く。手番が替わるので符号反転
+        self.pos_score = -(self.pos_score + 2*positional(f) + SQ_WEIGHT[sq])
+        return f
+
+    def undo(self, sq, f):
+        Position.undo(self, sq, f)
+        self.pos_score = -self.pos_score - 2*positional(f) - SQ_WEIGHT[sq]
+
+    def pass_turn(self):
+        Position.pass_turn(self)
+        self.pos_score = -self.pos_score
+
+class PositionalEvaluator:
+    """既定の評価器。Searcher は評価器の new_position で局面を作り evaluate で評価する"""
+
+    def new_position(self, own, opp, player):
+        return EvalPosition(own, opp, player)
+
+    def evaluate(self, pos):
+        return evaluate(pos)
+
+DEFAULT_EVALUATOR = PositionalEvaluator()
+
+def evaluate(pos):
+    """手番側から見た評価：位置重み + 石差 + モビリティ（pos は EvalPosition）"""
+    own, opp = pos.own, pos.opp
+    score_pos = pos.pos_score
+    disc_diff = popcount(own) - popcount(opp)
+    mob_diff = popcount(legal_moves(own, opp)) - popcount(legal_moves(opp, own))
+    return 4*score_pos + 2*disc_diff + 8*mob_diff
@@ -3,7 +3,17 @@
 
 import tkinter as tk
 from tkinter import messagebox
-import copy, math, time
+import multiprocessing
+import time
+import traceback
+
+import othello_book as opening_book
+import othello_engine as engine
+import othello_pattern as pattern
+import othello_probcut as mpc
+import othello_record as game_record
+import othello_search as search
+from othello_worker import POLL_MS, Ponder, SearchWorker, predicted_reply
 
 BOARD_SIZE = 8
 CELL = 60
@@ -18,8 +28,6 @@ GRID_COLOR = "#3d5f5f"
 HINT_COLOR = "#7fffd4"   # 合法手の点
 TEXT_COLOR = "white"
 
-DIRECTIONS = [(-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1)]
-
 # 角重視の簡易位置評価
 POS_WEIGHT = [
     [120,-20, 20,  5,  5, 20,-20,120],
@@ -38,37 +46,13 @@ def init_board():
     b[3][4] = b[4][3] = "X"
     return b
 
-def in_bounds(x, y): return 0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE
-
 def valid_moves(board, player):
-    opp = AI if player == HUMAN else HUMAN
-    moves = []
-    for x in range(BOARD_SIZE):
-        for y in range(BOARD_SIZE):
-            if board[x][y] != EMPTY: continue
-            ok = False
-            for dx, dy in DIRECTIONS:
-                nx, ny = x+dx, y+dy
-                seen = False
-                while in_bounds(nx, ny) and board[nx][ny] == opp:
-                    seen = True; nx += dx; ny += dy
-                if seen and in_bounds(nx, ny) and board[nx][ny] == player:
-                    ok = True; break
-            if ok: moves.append((x, y))
-    return moves
+    return engine.valid_moves(board, player)
 
 def make_move(board, x, y, player):
-    opp = AI if player == HUMAN else HUMAN
-    nb = copy.deepcopy(board)
-    nb[x][y] = player
-    for dx, dy in DIRECTIONS:
-        nx, ny = x+dx, y+dy
-        path = []
-        while in_bounds(nx, ny) and nb[nx][ny] == opp:
-            path.append((nx, ny)); nx += dx; ny += dy
-        if path and in_bounds(nx, ny) and nb[nx][ny] == player:
-            for px, py in path: nb[px][py] = player
-    return nb
+    own, opp = engine.board_to_bits(board, player)
+    own, opp = engine.play(own, opp, engine.square(x, y))
+    return engine.bits_to_board(own, opp, player)
 
 def count_discs(board):
     x = sum(r.count("X") for r in board)
@@ -78,55 +62,57 @@ def count_discs(board):
 def game_over(board):
     return not valid_moves(board, HUMAN) and not valid_moves(board, AI)
 
-def evaluate(board, root_player=HUMAN):
-    # 位置重み + 石差 + モビリティ
-    score_pos = 0
-    for i in range(BOARD_SIZE):
-        for j in range(BOARD_SIZE):
-            if board[i][j] == "X": score_pos += POS_WEIGHT[i][j]
-            elif board[i][j] == "O": score_pos -= POS_WEIGHT[i][j]
-    x_cnt, o_cnt = count_discs(board)
-    disc_diff = x_cnt - o_cnt
-    mob_diff = len(valid_moves(board, HUMAN)) - len(valid_moves(board, AI))
-    raw = 4*score_pos + 2*disc_diff + 8*mob_diff
-    return raw if root_player == HUMAN else -raw
-
-def minimax_max(board, me, opp, depth, alpha, beta, root_player):
-    if depth == 0 or game_over(board): return evaluate(board, root_player), None
-    mvs = valid_moves(board, me)
-    if not mvs: return minimax_min(board, me, opp, depth-1, alpha, beta, root_player)
-    best = None
-    for mv in sorted(mvs, key=lambda m: -POS_WEIGHT[m[0]][m[1]]):
-        nb = make_move(board, mv[0], mv[1], me)
-        sc, _ = minimax_min(nb, me, opp, depth-1, alpha, beta, root_player)
-        if sc > alpha: alpha, best = sc, mv
-        if alpha >= beta: break
-    return alpha, best
-
-def minimax_min(board, me, opp, depth, alpha, beta, root_player):
-    if depth == 0 or game_over(board): return evaluate(board, root_player), None
-    mvs = valid_moves(board, opp)
-    if not mvs: return minimax_max(board, me, opp, depth-1, alpha, beta, root_player)
-    best = None
-    for mv in sorted(mvs, key=lambda m: POS_WEIGHT[m[0]][m[1]]):
-        nb = make_move(board, mv[0], mv[1], opp)
-        sc, _ = minimax_max(nb, me, opp, depth-1, alpha, beta, root_player)
-        if sc < beta: beta, best = sc, mv
-        if alpha >= beta: break
-    return beta, best
-
-def ai_choice(board, depth=2):
-    me, opp = AI, HUMAN
-    score, mv = minimax_max(board, me, opp, depth, -math.inf, math.inf, root_player=HUMAN)
-    if mv is None:
-        mvs = valid_moves(board, me)
-        if not mvs: return None
-        mv = max(mvs, key=lambda m: POS_WEIGHT[m[0]][m[1]])
-    return mv
+def ai_choice(board, depth=2, searcher=None, time_limit=None, workers=None, smp_workers=None,
+              book=None, algorithm="alphabeta", aspiration=None):
+    # time_limit(秒)を指定すると深さの代わりに持ち時間で読む（反復深化）
+    # workers を指定するとルートの手を複数プロセスに分けて読む
+    # smp_workers を指定すると置換表を共有メモリに置いた複数プロセスで読む（Lazy SMP）
+    # algorithm="mtdf" なら深さ固定の探索を MTD(f) で行う
+    # aspiration（窓の半幅）を指定すると反復深化の各深さを前の値の周りの窓から読む
+    # 一緒に使えない指定は ValueError（search.check_choice）
+    # book（定跡）にある局面なら読まずに定跡の手を返す
+    if book is not None:
+        mv = book.probe(board, AI)
+        if mv is not None:
+            return mv
+    score, mv = search.choose(board, AI, depth=depth, time_limit=time_limit, workers=workers,
+                              smp_workers=smp_workers, algorithm=algorithm, aspiration=aspiration,
+                              searcher=searcher)
+    return mv if mv is not None else fallback_move(board)
+
+def fallback_move(board):
+    """読めなかったときの AI の手（位置重みで最良）。置けなければ None"""
+    mvs = valid_moves(board, AI)
+    if not mvs: return None
+    return max(mvs, key=lambda m: POS_WEIGHT[m[0]][m[1]])
 
 class OthelloApp:
-    def __init__(self, depth=2):
+    def __init__(self, depth=2, tt_mb=search.DEFAULT_TT_MB, time_limit=None, workers=None,
+                 smp_workers=None, weights=None, book=opening_book.DEFAULT_BOOK, algorithm="alphabeta",
+                 aspiration=None, selectivity=0, probcut=None, ponder=False,
+                 record=game_record.DEFAULT_RECORDS):
+        # 一緒に使えない探索の指定はここで ValueError にする
+        search.check_choice(time_limit, workers, smp_workers, algorithm, aspiration)
         self.depth = depth
+        self.algorithm = algorithm    # "alphabeta"（PVS）か "mtdf"
+        self.aspiration = aspiration  # 反復深化の aspiration の窓の半幅。None なら使わない
+        self.time_limit = time_limit  # 1手あたりの思考時間(秒)。None なら depth 固定
+        self.workers = workers        # 並列探索のプロセス数。None なら直列
+        self.smp_workers = smp_workers  # Lazy SMP のプロセス数。None なら直列
+        self.pondering = ponder       # True なら人間の手番のあいだに先読みする
+        self.record = record          # 対局を追記する棋譜ファイル。None なら保存しない
+        self.history = []             # この対局で打った手 (x, y)
+        # weights にパターン重みファイルを渡すとパターン評価で読む
+        evaluator = pattern.load_evaluator(weights) if weights else None
+        # selectivity（1〜4）を指定すると Multi-ProbCut で中盤の枝を切る（高いほど速く不正確）。
+        # weights と一緒に使うときは、その重みで fit した係数ファイルを probcut に渡す
+        probcut = mpc.load_probcut(selectivity, probcut, weights)
+        self.searcher = search.Searcher(tt_mb, evaluator=evaluator, probcut=probcut)  # 置換表は手をまたいで使い回す
+        # 定跡ファイル（なければ定跡なしで読む）
+        self.book = opening_book.load_book(book, missing_ok=True) if book else None
+        self.job = None    # 別スレッドで走っている AI の探索（SearchWorker）
+        self.ponder = None       # 人間の手番のあいだの先読み（Ponder）
+        self.ponder_move = None  # 先読みが当たったときの AI の手
         self.board = init_board()
         self.turn = HUMAN  # 先手：人間
         self.root = tk.Tk()
@@ -149,6 +135,13 @@ class OthelloApp:
         self.root.after(200, self.maybe_pass_to_ai)
 
     def reset(self):
+        if self.job is not None:
+            self.job.cancel()   # 読みかけの結果は捨てる
+        if self.ponder is not None:
+            self.ponder.cancel()
+            self.job, self.ponder = self.ponder.job, None   # 次の探索の前に抜けるのを待つ
+        self.ponder_move = None
+        self.save_record()   # 途中までの対局も残す
         self.board = init_board()
         self.turn = HUMAN
         self.status.set("あなたの番です（黒）")
@@ -198,11 +191,16 @@ class OthelloApp:
             self.status.set("そこには置けません（点の位置をクリック）")
             return
         self.board = make_move(self.board, i, j, HUMAN)
+        self.history.append((i, j))
         self.turn = AI
+        if self.ponder is not None:
+            self.ponder_move = self.ponder.finish((i, j), depth=self.depth, time_limit=self.time_limit)
+            self.job, self.ponder = self.ponder.job, None   # 次の探索の前に抜けるのを待つ
         self.draw()
         self.root.after(80, self.ai_step)
 
     def ai_step(self):
+        if self.turn != AI: return    # AI の番の前にリセットされた
         if game_over(self.board): return self.finish()
         mvs = valid_moves(self.board, AI)
         if not mvs:
@@ -211,20 +209,53 @@ class OthelloApp:
             self.draw()
             if not valid_moves(self.board, HUMAN): self.finish()
             return
+        if self.job is not None and not self.job.done():
+            # 止めた探索（リセット・先読み）が抜けるまで、Tk を止めずに待つ
+            self.root.after(POLL_MS, self.ai_step)
+            return
+        mv, self.ponder_move = self.ponder_move, None
+        if mv in mvs:
+            return self.play_ai(mv, "先読み")   # 先読みが当たったので読まずに打つ
         self.status.set("AIが思考中…")
-        self.root.update_idletasks()
-        start = time.time()
-        mv = ai_choice(self.board, depth=self.depth)
-        took = time.time() - start
+        self.start = time.time()
+        self.searcher.reset_stats()   # 定跡の手なら 0 ノードのまま
+        # 探索は別スレッドで走らせ、メインループは poll_ai で結果を待つ
+        kwargs = dict(depth=self.depth, searcher=self.searcher, time_limit=self.time_limit,
+                      workers=self.workers, smp_workers=self.smp_workers, book=self.book,
+                      algorithm=self.algorithm, aspiration=self.aspiration)
+        self.job = SearchWorker(self.searcher, ai_choice, (self.board,), kwargs).start()
+        self.root.after(POLL_MS, self.poll_ai, self.job)
+
+    def poll_ai(self, job):
+        if job.cancelled: return
+        for info in job.iterations():
+            self.status.set(f"AIが思考中… 深さ {info['depth']}, {info['nodes']:,} ノード")
+        if not job.done():
+            self.root.after(POLL_MS, self.poll_ai, job)
+            return
+        if job.error is not None:
+            # Tk のコールバックで投げても盤面が AI の番のまま止まるので、表示して手を打って続ける
+            traceback.print_exception(type(job.error), job.error, job.error.__traceback__)
+            self.job = None
+            mv = job.best if job.best in valid_moves(self.board, AI) else fallback_move(self.board)
+            return self.play_ai(mv, f"探索エラー: {job.error}")
+        self.play_ai(job.result, f"{time.time() - self.start:.2f}s")
+
+    def play_ai(self, mv, note):
         if mv is None:
             self.status.set("AIの着手に失敗。あなたの番です。")
             self.turn = HUMAN
             return
         self.board = make_move(self.board, mv[0], mv[1], AI)
-        self.status.set(f"AIの手: {mv}（{took:.2f}s） あなたの番です。")
+        self.history.append(mv)
+        self.status.set(f"AIの手: {mv}（{note}, {self.searcher.stats_text()}） あなたの番です。")
         self.turn = HUMAN
         self.draw()
-        if not valid_moves(self.board, HUMAN):
+        if valid_moves(self.board, HUMAN):
+            if self.pondering:
+                # 読み筋で予想した人間の応手の後を読んでおく（予想がなければ全応手）
+                self.ponder = Ponder(self.searcher, self.board, HUMAN, predicted_reply(self.searcher))
+        else:
             if not valid_moves(self.board, AI): self.finish()
             else:
                 self.status.set("あなたは置けません（パス）。AIの番です。")
@@ -238,7 +269,13 @@ class OthelloApp:
             self.draw()
             self.root.after(200, self.ai_step)
 
+    def save_record(self):
+        if self.record and self.history:
+            game_record.save_game(self.history, game_record.HUMAN, game_record.ENGINE, self.record)
+        self.history = []
+
     def finish(self):
+        self.save_record()
         xb, ob = count_discs(self.board)
         self.draw()
         if xb > ob: msg = f"ゲーム終了：黒(X) {xb} - 白(O) {ob}\nあなたの勝ち！"
@@ -249,5 +286,6 @@ class OthelloApp:
     def run(self): self.root.mainloop()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # アプリ化したときの並列探索用
     # depthは2〜4あたりが実用。上げると強いが時間がかかります。
     OthelloApp(depth=2).run()
\ No newline at end of file
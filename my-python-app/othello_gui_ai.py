@@ -4,9 +4,18 @@
 
 import tkinter as tk
 from tkinter import messagebox
-import copy
 import math
+import multiprocessing
 import time
+import traceback
+
+import othello_book as opening_book
+import othello_engine as engine
+import othello_pattern as pattern
+import othello_probcut as mpc
+import othello_record as game_record
+import othello_search as search
+from othello_worker import POLL_MS, Ponder, SearchWorker, predicted_reply
 
 BOARD_SIZE = 8
 CELL = 64            # マスのピクセル
@@ -17,8 +26,6 @@ GRID = "#3d5f5f"
 HINT = "#7fffd4"     # 合法手ハイライト
 HUMAN, AI = "X", "O"
 
-DIRECTIONS = [(-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1)]
-
 # 盤面の位置評価（角=高、辺=中、隅の隣=低）
 POS_WEIGHT = [
     [120,-20, 20,  5,  5, 20,-20,120],
@@ -37,45 +44,14 @@ def init_board():
     b[3][4] = b[4][3] = "X"
     return b
 
-def on_board(x, y):
-    return 0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE
-
 def valid_moves(board, player):
-    opp = "O" if player == "X" else "X"
-    moves = []
-    for x in range(BOARD_SIZE):
-        for y in range(BOARD_SIZE):
-            if board[x][y] != ".":
-                continue
-            flips_any = False
-            for dx, dy in DIRECTIONS:
-                nx, ny = x + dx, y + dy
-                seen = False
-                while on_board(nx, ny) and board[nx][ny] == opp:
-                    seen = True
-                    nx += dx; ny += dy
-                if seen and on_board(nx, ny) and board[nx][ny] == player:
-                    flips_any = True
-                    break
-            if flips_any:
-                moves.append((x, y))
-    return moves
+    return engine.valid_moves(board, player)
 
 def make_move(board, x, y, player):
     """置ける前提で呼ぶ。裏返しを適用し盤面を返す"""
-    opp = "O" if player == "X" else "X"
-    nb = copy.deepcopy(board)
-    nb[x][y] = player
-    for dx, dy in DIRECTIONS:
-        nx, ny = x + dx, y + dy
-        path = []
-        while on_board(nx, ny) and nb[nx][ny] == opp:
-            path.append((nx, ny))
-            nx += dx; ny += dy
-        if path and on_board(nx, ny) and nb[nx][ny] == player:
-            for px, py in path:
-                nb[px][py] = player
-    return nb
+    own, opp = engine.board_to_bits(board, player)
+    own, opp = engine.play(own, opp, engine.square(x, y))
+    return engine.bits_to_board(own, opp, player)
 
 def count_discs(board):
     x = sum(r.count("X") for r in board)
@@ -85,78 +61,41 @@ def count_discs(board):
 def game_over(board):
     return not valid_moves(board, "X") and not valid_moves(board, "O")
 
-def evaluate(board, player):
-    """簡易評価：位置重み + 石差 + モビリティ"""
-    opp = "O" if player == "X" else "X"
-    score_pos = 0
-    x_cnt, o_cnt = 0, 0
-    for i in range(BOARD_SIZE):
-        for j in range(BOARD_SIZE):
-            if board[i][j] == "X":
-                score_pos += POS_WEIGHT[i][j]
-                x_cnt += 1
-            elif board[i][j] == "O":
-                score_pos -= POS_WEIGHT[i][j]
-                o_cnt += 1
-    # 石差（黒正とする。playerが白なら符号反転する）
-    disc_diff = (x_cnt - o_cnt)
-    # モビリティ（合法手の数差）
-    mob = len(valid_moves(board, "X")) - len(valid_moves(board, "O"))
-
-    raw = 4*score_pos + 2*disc_diff + 8*mob
-    return raw if player == "X" else -raw
-
-def minimax(board, player, depth=3, alpha=-math.inf, beta=math.inf):
+def minimax(board, player, depth=3, alpha=-math.inf, beta=math.inf, searcher=None):
     """αβ枝刈りミニマックス。player視点の最大化"""
-    if depth == 0 or game_over(board):
-        return evaluate(board, player), None
-
-    me = player
-    opp = "O" if me == "X" else "X"
-    moves = valid_moves(board, me)
-    if not moves:
-        # パスして相手の手番へ
-        score, _ = minimax(board, opp, depth-1, alpha, beta)
-        return score, None
-
-    best_move = None
-    for mv in sorted(moves, key=lambda m: -POS_WEIGHT[m[0]][m[1]]):
-        nb = make_move(board, mv[0], mv[1], me)
-        # 相手番の評価は反転して返ってくるように、相手を最大化させて自分は最小化
-        score, _ = minimax_opponent(nb, opp, depth-1, alpha, beta, player_root=player)
-        if score > alpha:
-            alpha = score
-            best_move = mv
-        if alpha >= beta:
-            break
-    return alpha, best_move
-
-def minimax_opponent(board, player, depth, alpha, beta, player_root):
-    """相手側のノード（最小化側）"""
-    if depth == 0 or game_over(board):
-        return evaluate(board, player_root), None
-
-    me = player
-    opp = "O" if me == "X" else "X"
-    moves = valid_moves(board, me)
-    if not moves:
-        score, _ = minimax(board, opp, depth-1, alpha, beta)  # 相手がパス→自分手番へ
-        return score, None
-
-    best_move = None
-    for mv in sorted(moves, key=lambda m: POS_WEIGHT[m[0]][m[1]]):
-        nb = make_move(board, mv[0], mv[1], me)
-        score, _ = minimax(nb, opp, depth-1, alpha, beta)
-        if score < beta:
-            beta = score
-            best_move = mv
-        if alpha >= beta:
-            break
-    return beta, best_move
+    return search.search(board, player, depth, alpha, beta, searcher=searcher)
+
+def fallback_move(board):
+    """読めなかったときの AI の手（位置重みで最良）"""
+    return max(valid_moves(board, AI), key=lambda m: POS_WEIGHT[m[0]][m[1]])
 
 class OthelloGUI:
-    def __init__(self, depth=3):
+    def __init__(self, depth=3, tt_mb=search.DEFAULT_TT_MB, time_limit=None, workers=None,
+                 smp_workers=None, weights=None, book=opening_book.DEFAULT_BOOK, algorithm="alphabeta",
+                 aspiration=None, selectivity=0, probcut=None, ponder=False,
+                 record=game_record.DEFAULT_RECORDS):
+        # 一緒に使えない探索の指定はここで ValueError にする
+        search.check_choice(time_limit, workers, smp_workers, algorithm, aspiration)
         self.depth = depth
+        self.algorithm = algorithm    # "alphabeta"（PVS）か "mtdf"
+        self.aspiration = aspiration  # 反復深化の aspiration の窓の半幅。None なら使わない
+        self.time_limit = time_limit  # 1手あたりの思考時間(秒)。None なら depth 固定
+        self.workers = workers        # 並列探索のプロセス数。None なら直列
+        self.smp_workers = smp_workers  # Lazy SMP のプロセス数。None なら直列
+        self.pondering = ponder       # True なら人間の手番のあいだに先読みする
+        self.record = record          # 対局を追記する棋譜ファイル。None なら保存しない
+        self.history = []             # この対局で打った手 (x, y)
+        # weights にパターン重みファイルを渡すとパターン評価で読む
+        evaluator = pattern.load_evaluator(weights) if weights else None
+        # selectivity（1〜4）を指定すると Multi-ProbCut で中盤の枝を切る（高いほど速く不正確）。
+        # weights と一緒に使うときは、その重みで fit した係数ファイルを probcut に渡す
+        probcut = mpc.load_probcut(selectivity, probcut, weights)
+        self.searcher = search.Searcher(tt_mb, evaluator=evaluator, probcut=probcut)  # 置換表（サイズはMB指定）
+        # 定跡ファイル（なければ定跡なしで読む）
+        self.book = opening_book.load_book(book, missing_ok=True) if book else None
+        self.job = None    # 別スレッドで走っている AI の探索（SearchWorker）
+        self.ponder = None       # 人間の手番のあいだの先読み（Ponder）
+        self.ponder_move = None  # 先読みが当たったときの AI の手
         self.board = init_board()
         self.turn = HUMAN  # 先手：人間（黒）
         self.root = tk.Tk()
@@ -180,6 +119,14 @@ class OthelloGUI:
         self.root.after(200, self.maybe_pass_to_ai)
 
     def reset(self):
+        if self.job is not None:
+            self.job.cancel()   # 読みかけの結果は捨てる
+        if self.ponder is not None:
+            # 先読みも止め、次の探索の前に抜けるのを待つ
+            self.ponder.cancel()
+            self.job, self.ponder = self.ponder.job, None
+        self.ponder_move = None
+        self.save_record()   # 途中までの対局も残す
         self.board = init_board()
         self.turn = HUMAN
         self.status.set("あなたの番です（黒）")
@@ -238,11 +185,20 @@ class OthelloGUI:
             self.status.set("そこには置けません。ハイライト箇所を選んでください。")
             return
         self.board = make_move(self.board, x, y, HUMAN)
+        self.history.append((x, y))
         self.turn = AI
+        if self.ponder is not None:
+            # 予想どおりの手で十分読めていれば、その手をそのまま使う
+            self.ponder_move = self.ponder.finish((x, y), depth=self.search_depth(self.board),
+                                                  time_limit=self.time_limit)
+            self.job, self.ponder = self.ponder.job, None   # 次の探索の前に抜けるのを待つ
         self.draw()
         self.root.after(100, self.ai_move_step)
 
     def ai_move_step(self):
+        if self.turn != AI:
+            # AIの番の前にリセットされた
+            return
         if game_over(self.board):
             self.finish()
             return
@@ -256,25 +212,73 @@ class OthelloGUI:
                 self.finish()
             return
 
+        if self.job is not None and not self.job.done():
+            # 止めた探索（リセット・先読み）が抜けるまで、Tk を止めずに待つ
+            self.root.after(POLL_MS, self.ai_move_step)
+            return
+        mv, self.ponder_move = self.ponder_move, None
+        if mv is not None and mv in valid_moves(self.board, AI):
+            # 先読みが当たったので読まずに打つ
+            self.play_ai(mv, "先読み")
+            return
         self.status.set("AIが考えています…")
-        self.root.update_idletasks()
-        start = time.time()
+        self.start = time.time()
+        self.searcher.reset_stats()   # 定跡の手なら 0 ノードのまま
+        # 探索は別スレッドで走らせ、メインループは poll_ai で結果を待つ
+        self.job = SearchWorker(self.searcher, self.choose_move, (self.board,)).start()
+        self.root.after(POLL_MS, self.poll_ai, self.job)
+
+    def choose_move(self, board):
+        """AIの手を読む（探索スレッドで呼ばれるので Tk には触れない）"""
+        # 定跡にある局面なら読まない
+        mv = self.book.probe(board, AI) if self.book is not None else None
+        if mv is not None:
+            return mv
+        # 持ち時間・並列・MTD(f)・aspiration の振り分けは search.choose に任せる
+        score, mv = search.choose(board, AI, depth=self.search_depth(board), time_limit=self.time_limit,
+                                  workers=self.workers, smp_workers=self.smp_workers,
+                                  algorithm=self.algorithm, aspiration=self.aspiration,
+                                  searcher=self.searcher)
+        # 念のためフォールバック
+        return mv if mv is not None else fallback_move(board)
+
+    def search_depth(self, board):
+        """深さ固定のときに読む深さ"""
         depth = self.depth
         # 終盤は深く読む
-        empty = sum(r.count(".") for r in self.board)
+        empty = sum(r.count(".") for r in board)
         if empty <= 14:
             depth = min(5, depth+1)
-        score, mv = minimax(self.board, AI, depth=depth)
-        # 念のためフォールバック
-        if mv is None:
-            mvs = valid_moves(self.board, AI)
-            mv = max(mvs, key=lambda m: POS_WEIGHT[m[0]][m[1]])
+        return depth
+
+    def poll_ai(self, job):
+        if job.cancelled:
+            return
+        for info in job.iterations():
+            self.status.set(f"AIが考えています… 深さ {info['depth']}, {info['nodes']:,} ノード")
+        if not job.done():
+            self.root.after(POLL_MS, self.poll_ai, job)
+            return
+        if job.error is not None:
+            # Tk のコールバックで投げても盤面が AI の番のまま止まるので、表示して手を打って続ける
+            traceback.print_exception(type(job.error), job.error, job.error.__traceback__)
+            self.job = None
+            mv = job.best if job.best in valid_moves(self.board, AI) else fallback_move(self.board)
+            self.play_ai(mv, f"探索エラー: {job.error}")
+            return
+        self.play_ai(job.result, f"{time.time() - self.start:.2f}s")
+
+    def play_ai(self, mv, note):
         self.board = make_move(self.board, mv[0], mv[1], AI)
-        took = time.time() - start
-        self.status.set(f"AIの手：{mv}（{took:.2f}s） あなたの番です。")
+        self.history.append(mv)
+        self.status.set(f"AIの手：{mv}（{note}, {self.searcher.stats_text()}） あなたの番です。")
         self.turn = HUMAN
         self.draw()
-        if not valid_moves(self.board, HUMAN):
+        if valid_moves(self.board, HUMAN):
+            if self.pondering:
+                # 読み筋で予想した人間の応手の後を読んでおく（予想がなければ全応手）
+                self.ponder = Ponder(self.searcher, self.board, HUMAN, predicted_reply(self.searcher))
+        else:
             # 人間が置けなければAI続行
             if not valid_moves(self.board, AI):
                 self.finish()
@@ -290,7 +294,14 @@ class OthelloGUI:
             self.draw()
             self.root.after(200, self.ai_move_step)
 
+    def save_record(self):
+        """この対局を棋譜ファイルに追記する"""
+        if self.record and self.history:
+            game_record.save_game(self.history, game_record.HUMAN, game_record.ENGINE, self.record)
+        self.history = []
+
     def finish(self):
+        self.save_record()
         xb, ob = count_discs(self.board)
         self.draw()
         if xb > ob:
@@ -305,6 +316,7 @@ class OthelloGUI:
         self.root.mainloop()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # アプリ化したときの並列探索用
     # 深さは2～4程度が目安。数値を上げると強くなるが思考時間が延びます。
     app = OthelloGUI(depth=3)
     app.run()
\ No newline at end of file
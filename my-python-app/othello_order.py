@@ -0,0 +1,63 @@
+# othello_order.py
+# 中盤探索の着手順（置換表の手 → キラー手 → ヒストリー → 位置重み）
+
+from othello_engine import flips, iter_bits, legal_moves, popcount
+from othello_eval import SQ_WEIGHT
+
+N_KILLERS = 2
+HASH_KEY = 1 << 30        # 並べ替えの優先度（大きいほど先）
+KILLER_KEY = 1 << 28
+MOBILITY_KEY = 1 << 20    # 相手の着手数1つぶんの重み（ヒストリーより優先）
+
+class MoveOrderer:
+    """探索器ごとに持つ着手順の学習状態。
+    キラー手は深さ（空きマス数）ごとに直近でβカットした手、
+    ヒストリーは手番×マスごとにβカットした回数を深さの2乗で重みづけしたもの。
+    fastest_first_depth を指定すると、残り深さがそれ以上のノードでは
+    相手の着手数が少ない手から読む（合法手生成が増えるので既定では使わない）
+    """
+
+    def __init__(self, fastest_first_depth=None):
+        self.fastest_first_depth = fastest_first_depth
+        self.clear()
+
+    def clear(self):
+        self.killers = [[None] * N_KILLERS for _ in range(65)]
+        self.history = {"X": [0] * 64, "O": [0] * 64}
+
+    def new_search(self):
+        """探索ごとにキラー手は捨て、ヒストリーは半減させて残す"""
+        for k in self.killers:
+            k[:] = [None] * N_KILLERS
+        for h in self.history.values():
+            for sq in range(64):
+                h[sq] >>= 1
+
+    def order(self, pos, mask, hash_move=None, depth=0):
+        """合法手 mask を読む順に並べたマス番号のリスト"""
+        killers = self.killers[pos.empties()]
+        history = self.history[pos.player]
+        fastest = self.fastest_first_depth is not None and depth >= self.fastest_first_depth
+        own, opp = pos.own, pos.opp
+        keyed = []
+        for sq in iter_bits(mask):
+            if sq == hash_move:
+                key = HASH_KEY
+            elif sq in killers:
+                key = KILLER_KEY - killers.index(sq)
+            else:
+                key = history[sq] * 4 + SQ_WEIGHT[sq]
+                if fastest:
+                    f = flips(own, opp, sq)
+                    key -= popcount(legal_moves(opp ^ f, own | f | (1 << sq))) * MOBILITY_KEY
+            keyed.append((key, sq))
+        keyed.sort(reverse=True)
+        return [sq for _, sq in keyed]
+
+    def cutoff(self, pos, sq, depth):
+        """pos（undo 後）で手 sq がβカットを起こした"""
+        killers = self.killers[pos.empties()]
+        if killers[0] != sq:
+            killers[1:] = killers[:-1]
+            killers[0] = sq
+        self.history[pos.player][sq] += depth * depth
@@ -0,0 +1,240 @@
+# othello_parallel.py
+# 複数コアでの探索（ルート分割のプロセス並列 / Lazy SMP のプロセス並列）
+#
+# Lazy SMP の置換表は共有メモリ上に置く（othello_tt.SharedTranspositionTable）。
+# スレッドでは GIL で1コアしか使えず、補助が増えるほど遅くなるのでプロセスで読む。
+
+import atexit
+import math
+import os
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from othello_engine import coords, popcount
+from othello_search import Searcher, SearchTimeout, default_searcher, ordered_moves
+from othello_tt import EXACT, SHARED_ENTRY_BYTES, SharedTranspositionTable
+
+PARALLEL_MIN_DEPTH = 4   # これより浅い探索は並列化の手間の方が大きいので直列
+STOP_POLL = 0.05         # ワーカーの結果を待つあいだ searcher.stop を見る間隔（秒）
+
+_pool = None
+_pool_workers = 0
+_pool_evaluator = None
+_pool_probcut = None
+_shared_alpha = None     # 全ワーカーで共有する現在の α（ルートの手番側視点）
+_pool_stop = None        # 1 にするとワーカーが探索をやめる
+_smp_pool = None
+_smp_key = None          # プールを作ったときの (補助の数, 探索器の設定)
+_smp_tt = None
+_smp_stop = None         # 1 にすると補助が探索をやめる
+_atexit_registered = False
+
+# --- ワーカープロセス側 ---
+
+_worker_searcher = None
+_worker_alpha = None
+_worker_stop = None
+
+class _WorkerSearcher(Searcher):
+    """ワーカーの探索器。呼び出し側の stop の代わりに共有の停止フラグを見る"""
+
+    def check_stop(self):
+        if _worker_stop.value:
+            raise SearchTimeout()
+
+def _init_worker(shared_alpha, stop, evaluator, probcut):
+    global _worker_searcher, _worker_alpha, _worker_stop
+    # 置換表はプロセスごとに持ち、ジョブをまたいで使う
+    _worker_searcher = _WorkerSearcher(evaluator=evaluator, probcut=probcut)
+    _worker_alpha = shared_alpha
+    _worker_stop = stop
+
+def _root_job(own, opp, player, sq, depth, alpha):
+    """ルートの1手 sq を読む。(sq, 評価値, 使った α, ノード数) を返す（止められたら評価値は None）"""
+    # 他のワーカーが α を上げていればそれを使う
+    alpha = max(alpha, _worker_alpha.value)
+    s = _worker_searcher
+    s.tt.new_search()
+    s.reset_stats()
+    pos = s.evaluator.new_position(own, opp, player)
+    pos.apply(sq)
+    try:
+        sc, _ = s.pvs(pos, depth-1, -math.inf, -alpha)
+    except SearchTimeout:
+        return sq, None, alpha, s.nodes
+    sc = -sc
+    if sc > alpha:
+        with _worker_alpha.get_lock():
+            if sc > _worker_alpha.value:
+                _worker_alpha.value = sc
+    return sq, sc, alpha, s.nodes
+
+def _init_smp_worker(tt, stop, endgame_empties, evaluator, probcut):
+    global _worker_searcher, _worker_stop
+    _worker_searcher = _WorkerSearcher(tt=tt, endgame_empties=endgame_empties, evaluator=evaluator,
+                                       probcut=probcut)
+    _worker_stop = stop
+
+def _smp_job(own, opp, player, depth, first):
+    """停止フラグが立つまで深さ1から depth まで読み、置換表を埋める。ノード数を返す"""
+    s = _worker_searcher
+    s.ordering.new_search()
+    pos = s.evaluator.new_position(own, opp, player)
+    s.reset_stats()
+    try:
+        for d in range(1, depth + 1):
+            s.pvs(pos, d, -math.inf, math.inf, first=first)
+    except SearchTimeout:
+        pass
+    return s.nodes
+
+# --- 呼び出し側 ---
+
+def _register_shutdown():
+    """最初にプールを作ったときに、終了時の shutdown() を登録する（共有メモリを消し、ワーカーを止める）"""
+    global _atexit_registered
+    if not _atexit_registered:
+        atexit.register(shutdown)
+        _atexit_registered = True
+
+def get_pool(workers, evaluator=None, probcut=None):
+    """プロセスプールを（必要なら作り直して）返す。生成は重いので使い回す"""
+    global _pool, _pool_workers, _pool_evaluator, _pool_probcut, _shared_alpha, _pool_stop
+    if (_pool is None or _pool_workers != workers or _pool_evaluator is not evaluator
+            or _pool_probcut is not probcut):
+        shutdown()
+        _register_shutdown()
+        _shared_alpha = multiprocessing.Value("d", -math.inf)
+        _pool_stop = multiprocessing.Value("b", 0, lock=False)
+        _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                    initargs=(_shared_alpha, _pool_stop, evaluator, probcut))
+        _pool_workers = workers
+        _pool_evaluator = evaluator
+        _pool_probcut = probcut
+    return _pool
+
+def get_smp_pool(helpers, searcher):
+    """Lazy SMP の補助プロセスのプールと共有置換表を（必要なら作り直して）返す。
+    置換表は searcher の表と同じエントリ数
+    """
+    global _smp_pool, _smp_key, _smp_tt, _smp_stop
+    key = (helpers, searcher.tt.size, searcher.endgame_empties, searcher.evaluator, searcher.probcut)
+    if _smp_pool is None or _smp_key != key:
+        shutdown_smp()
+        _register_shutdown()
+        _smp_tt = SharedTranspositionTable(max(1, searcher.tt.size * SHARED_ENTRY_BYTES >> 20))
+        _smp_stop = multiprocessing.Value("b", 0, lock=False)
+        _smp_pool = ProcessPoolExecutor(max_workers=helpers, initializer=_init_smp_worker,
+                                        initargs=(_smp_tt, _smp_stop, searcher.endgame_empties,
+                                                  searcher.evaluator, searcher.probcut))
+        _smp_key = key
+    return _smp_pool, _smp_tt, _smp_stop
+
+def shutdown():
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool_stop.value = 1
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+        _pool_workers = 0
+    shutdown_smp()
+
+def shutdown_smp():
+    global _smp_pool, _smp_key, _smp_tt
+    if _smp_pool is not None:
+        _smp_stop.value = 1
+        _smp_pool.shutdown(cancel_futures=True)
+        _smp_tt.close()
+        _smp_pool = _smp_key = _smp_tt = None
+
+def search_parallel(board, player, depth, workers=None, searcher=None):
+    """ルート分割の並列αβ（Young Brothers Wait）。
+    最有力の1手だけ直列に読んで α を確定させ、残りの手をワーカーに配る。
+    ワーカーは共有 α を読んでから探索し、改善したら書き戻す。
+    浅い探索・終盤の完全読み・合法手1つ以下のときは直列探索と同じ。
+    searcher.stop が立つと、まだ始まっていない手は取り消し、読んでいるワーカーも止めて
+    SearchTimeout を投げる。
+    (評価値, (x, y) or None) を返す
+    """
+    searcher = searcher or default_searcher()
+    workers = workers or os.cpu_count() or 1
+    pos = searcher.new_position(board, player)
+    mvs = pos.moves()
+    if (workers <= 1 or depth < PARALLEL_MIN_DEPTH or popcount(mvs) <= 1
+            or pos.empties() <= searcher.endgame_empties):
+        return searcher.search(board, player, depth)
+
+    pos = searcher.begin(board, player)
+    e = searcher.tt.probe(pos.hash)
+    order = ordered_moves(mvs, e[4] if e is not None else None)
+
+    # 長男は直列で読む（ここで得た値が残りの手の α になる）
+    first = order[0]
+    f = pos.apply(first)
+    best_sc, _ = searcher.pvs(pos, depth-1, -math.inf, math.inf)
+    best_sc = -best_sc
+    pos.undo(first, f)
+    best = first
+
+    pool = get_pool(workers, searcher.evaluator, searcher.probcut)
+    _shared_alpha.value = best_sc
+    _pool_stop.value = 0
+    pending = {pool.submit(_root_job, pos.own, pos.opp, player, sq, depth, best_sc)
+               for sq in order[1:]}
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=STOP_POLL, return_when=FIRST_COMPLETED)
+            for fut in done:
+                sq, sc, used_alpha, nodes = fut.result()
+                searcher.nodes += nodes
+                # β=∞ なので α を超えた値は確定値
+                if sc is not None and sc > used_alpha and sc > best_sc:
+                    best, best_sc = sq, sc
+            if searcher.stop:
+                raise SearchTimeout()
+    finally:
+        if pending:
+            # 残りを止め、読んでいるワーカーが抜けるまで待つ（次の探索にまたがらないように）
+            _pool_stop.value = 1
+            for fut in pending:
+                fut.cancel()
+            wait(pending)
+    searcher.tt.store(pos.hash, depth, EXACT, best_sc, best)
+    # ワーカーの統計はノード数だけ合算する
+    searcher.pv = [coords(best)]
+    searcher.iteration_done(depth, best_sc)
+    return best_sc, coords(best)
+
+def search_lazy_smp(board, player, depth, workers, searcher=None, time_limit=None, window=None):
+    """Lazy SMP：workers 個のプロセスが共有メモリの置換表を使って同じ反復深化を走らせる。
+    補助プロセスは読む深さ（奇数番は +1）と最初に読むルートの手をずらし、
+    置換表を通じてメインの探索に結果を渡す。メインが読み終えたら補助を止める。
+    メイン（呼び出し元のプロセス）は読むあいだだけ searcher の置換表を共有の表に差し替える。
+    メインは search_timed で読むので、window を渡すと aspiration の窓から読む。
+    (評価値, (x, y) or None) を返す
+    """
+    main = searcher or default_searcher()
+    pos = main.new_position(board, player)
+    if workers <= 1 or pos.empties() <= main.endgame_empties or not pos.moves():
+        if time_limit is not None or window is not None:
+            return main.search_timed(board, player, time_limit if time_limit is not None else math.inf,
+                                     max_depth=depth, window=window)[:2]
+        return main.search(board, player, depth)
+
+    pool, tt, stop = get_smp_pool(workers - 1, main)
+    root_moves = ordered_moves(pos.moves())
+    own_tt, main.tt = main.tt, tt
+    stop.value = 0
+    futures = [pool.submit(_smp_job, pos.own, pos.opp, player, depth + (i % 2),
+                           root_moves[i % len(root_moves)])
+               for i in range(1, workers)]
+    try:
+        score, mv, _ = main.search_timed(board, player,
+                                         time_limit if time_limit is not None else math.inf,
+                                         max_depth=depth, window=window)
+    finally:
+        stop.value = 1
+        main.tt = own_tt
+        nodes = sum(fut.result() for fut in futures)
+    main.nodes += nodes
+    return score, mv
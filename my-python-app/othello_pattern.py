@@ -0,0 +1,199 @@
+# othello_pattern.py
+# パターン評価（辺+2X, 隅3x3, 隅2x5, 斜め）。重みは進行度ごとの表をバイナリファイルから読む。
+#
+# 各パターンは盤上の数マスの並びで、マスの状態を 0=空き, 1=黒(X), 2=白(O) として
+# 3進数に読んだ値をインデックスに表を引く。8つの対称形は同じ表を共有する。
+# インデックスは黒白の固定視点で持ち、apply/undo で変わったマスの分だけ差分更新する。
+# 白番で評価するときは 1 と 2 を入れ替えたインデックス（SWAP）で引く。
+
+import struct
+import sys
+from array import array
+
+from othello_engine import (BOARD_SIZE, SYMMETRY_MAPS, Position, iter_bits,
+                            legal_moves, popcount)
+
+MAGIC = b"OTPW"
+VERSION = 1
+N_STAGES = 16          # 進行度の段階数
+STAGE_WIDTH = 4        # 何石ごとに段階を分けるか
+SCALE = 32             # 重みの単位（1石 = SCALE）
+EXTRAS = ["mobility", "bias"]   # パターン以外の係数（モビリティ差, 定数項）
+HEADER = struct.Struct("<4sHHHHH")  # MAGIC, VERSION, 段階数, 段階幅, SCALE, パターン数
+
+def _sq(x, y):
+    return x*BOARD_SIZE + y
+
+# 左上隅を基準にしたパターン（対称形は自動で作る）
+BASE_PATTERNS = [
+    ("edge2x",    [_sq(0, y) for y in range(8)] + [_sq(1, 1), _sq(1, 6)]),
+    ("corner3x3", [_sq(x, y) for x in range(3) for y in range(3)]),
+    ("corner2x5", [_sq(x, y) for x in range(2) for y in range(5)]),
+    ("diag8",     [_sq(i, i) for i in range(8)]),
+    ("diag7",     [_sq(i, i + 1) for i in range(7)]),
+    ("diag6",     [_sq(i, i + 2) for i in range(6)]),
+    ("diag5",     [_sq(i, i + 3) for i in range(5)]),
+    ("diag4",     [_sq(i, i + 4) for i in range(4)]),
+]
+
+GROUP_NAMES = [name for name, _ in BASE_PATTERNS]
+GROUP_SIZES = [3 ** len(sqs) for _, sqs in BASE_PATTERNS]
+
+def _instances():
+    """全パターンの対称形（マスの集合が同じものは1つにまとめる）"""
+    instances, groups = [], []
+    for g, (_, sqs) in enumerate(BASE_PATTERNS):
+        seen = set()
+        for m in SYMMETRY_MAPS:
+            inst = tuple(m[sq] for sq in sqs)
+            if frozenset(inst) in seen:
+                continue
+            seen.add(frozenset(inst))
+            instances.append(inst)
+            groups.append(g)
+    return instances, groups
+
+INSTANCES, INSTANCE_GROUP = _instances()
+
+# マスごとに (そのマスを含むパターン番号, 3のべき) の一覧
+SQ_TERMS = [[] for _ in range(64)]
+for _i, _inst in enumerate(INSTANCES):
+    for _k, _sq_ in enumerate(_inst):
+        SQ_TERMS[_sq_].append((_i, 3 ** (len(_inst) - 1 - _k)))
+
+def _swap_table(n):
+    """長さ n のパターンで黒と白を入れ替えたインデックス"""
+    t = array("i", [0]) * (3 ** n)
+    for idx in range(3 ** n):
+        v, p, r = idx, 1, 0
+        for _ in range(n):
+            d = v % 3
+            r += (0, 2, 1)[d] * p
+            v //= 3
+            p *= 3
+        t[idx] = r
+    return t
+
+SWAP = [_swap_table(len(sqs)) for _, sqs in BASE_PATTERNS]
+
+def pattern_indices(black, white):
+    """黒視点の全パターンのインデックスを一から計算する"""
+    idx = []
+    for inst in INSTANCES:
+        v = 0
+        for sq in inst:
+            v *= 3
+            if black >> sq & 1:
+                v += 1
+            elif white >> sq & 1:
+                v += 2
+        idx.append(v)
+    return idx
+
+def stage_of(own, opp):
+    return min(N_STAGES - 1, (popcount(own | opp) - 4) // STAGE_WIDTH)
+
+class PatternPosition(Position):
+    """パターンのインデックスを apply/undo で差分更新する局面"""
+
+    def __init__(self, own, opp, player="X"):
+        super().__init__(own, opp, player)
+        black, white = (own, opp) if player == "X" else (opp, own)
+        self.indices = pattern_indices(black, white)
+
+    def copy(self):
+        pos = Position.copy(self)
+        pos.indices = list(self.indices)
+        return pos
+
+    def _update(self, sq, f, color, sign):
+        idx = self.indices
+        c = (1 if color == "X" else 2) * sign
+        for i, p in SQ_TERMS[sq]:
+            idx[i] += p * c
+        # 裏返し：相手の色(3-c)から自分の色(c)へ
+        d = (1 if color == "X" else -1) * sign
+        for s in iter_bits(f):
+            for i, p in SQ_TERMS[s]:
+                idx[i] -= p * d
+
+    def apply(self, sq):
+        color = self.player
+        f = Position.apply(self, sq)
+        self._update(sq, f, color, 1)
+        return f
+
+    def undo(self, sq, f):
+        Position.undo(self, sq, f)
+        self._update(sq, f, self.player, -1)
+
+class PatternEvaluator:
+    """進行度ごとのパターン表で評価する。weights[stage][group] は array('h')、
+    extras[stage] は EXTRAS の順の係数。値は手番側視点で SCALE 倍の石差
+    """
+
+    def __init__(self, weights, extras):
+        self.weights = weights
+        self.extras = extras
+
+    @classmethod
+    def zeros(cls):
+        weights = [[array("h", [0]) * n for n in GROUP_SIZES] for _ in range(N_STAGES)]
+        extras = [[0] * len(EXTRAS) for _ in range(N_STAGES)]
+        return cls(weights, extras)
+
+    def new_position(self, own, opp, player):
+        return PatternPosition(own, opp, player)
+
+    def evaluate(self, pos):
+        own, opp = pos.own, pos.opp
+        stage = stage_of(own, opp)
+        tables = self.weights[stage]
+        score = 0
+        if pos.player == "X":
+            for g, v in zip(INSTANCE_GROUP, pos.indices):
+                score += tables[g][v]
+        else:
+            for g, v in zip(INSTANCE_GROUP, pos.indices):
+                score += tables[g][SWAP[g][v]]
+        mob, bias = self.extras[stage]
+        score += mob * (popcount(legal_moves(own, opp)) - popcount(legal_moves(opp, own)))
+        return score + bias
+
+    def save(self, path):
+        """重みファイルを書く（リトルエンディアン int16）"""
+        with open(path, "wb") as fp:
+            fp.write(HEADER.pack(MAGIC, VERSION, N_STAGES, STAGE_WIDTH, SCALE, len(BASE_PATTERNS)))
+            for stage in range(N_STAGES):
+                for t in self.weights[stage]:
+                    if sys.byteorder != "little":
+                        t = array("h", t)
+                        t.byteswap()
+                    fp.write(t.tobytes())
+                fp.write(struct.pack("<%dh" % len(EXTRAS), *self.extras[stage]))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as fp:
+            magic, version, n_stages, width, scale, n_groups = HEADER.unpack(fp.read(HEADER.size))
+            if (magic != MAGIC or version != VERSION or n_stages != N_STAGES
+                    or width != STAGE_WIDTH or scale != SCALE or n_groups != len(BASE_PATTERNS)):
+                raise ValueError(f"パターン重みファイルの形式が違います: {path}")
+            weights, extras = [], []
+            for _ in range(N_STAGES):
+                tables = []
+                for n in GROUP_SIZES:
+                    t = array("h")
+                    t.frombytes(fp.read(2 * n))
+                    if len(t) != n:
+                        raise ValueError(f"パターン重みファイルが途中で切れています: {path}")
+                    if sys.byteorder != "little":
+                        t.byteswap()
+                    tables.append(t)
+                weights.append(tables)
+                extras.append(list(struct.unpack("<%dh" % len(EXTRAS), fp.read(2 * len(EXTRAS)))))
+        return cls(weights, extras)
+
+def load_evaluator(path):
+    """重みファイルからパターン評価器を作る（Searcher(evaluator=...) に渡す）"""
+    return PatternEvaluator.load(path)
@@ -0,0 +1,175 @@
+# othello_perft.py
+# 合法手生成と着手の速度・正しさを調べる perft（初期盤面から深さ N の末端局面数）
+#
+#   python othello_perft.py 9                 # ビットボードで深さ1〜9、nodes/s を表示
+#   python othello_perft.py 6 --check 5       # さらに各フロントエンドの valid_moves/make_move を深さ5まで突き合わせる
+#   python othello_perft.py 10 --batch        # NumPy の一括版（othello_batch）でも数える
+#
+# パスも1手として数え、終局した局面はその深さに達していなくても末端として1と数える。
+# 既知の値（KNOWN）と違えば終了コード 1 で終わるので、エンジンを速くするときの回帰チェックに使う。
+# フロントエンドの valid_moves/make_move はどれも othello_engine を呼ぶので、--check では
+# エンジンと独立した1マスずつ調べる参照実装（reference_valid_moves/reference_make_move）と突き合わせる。
+
+import argparse
+import copy
+import sys
+import time
+
+from othello_engine import flips, initial_bits, iter_bits, legal_moves, opponent_of, popcount
+
+# 初期盤面からの perft の既知の値（深さ: 末端局面数）
+KNOWN = {1: 4, 2: 12, 3: 56, 4: 244, 5: 1396, 6: 8200, 7: 55092, 8: 390216,
+         9: 3005288, 10: 24571284, 11: 212258976}
+
+# --- 参照実装（othello_engine を使わない。速さより分かりやすさ） ---
+
+DIRECTIONS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+def reference_init_board():
+    b = [["." for _ in range(8)] for _ in range(8)]
+    b[3][3] = b[4][4] = "O"
+    b[3][4] = b[4][3] = "X"
+    return b
+
+def _captures(board, x, y, player):
+    """(x, y) に player が打ったとき裏返る石の座標のリスト"""
+    opp = "O" if player == "X" else "X"
+    out = []
+    for dx, dy in DIRECTIONS:
+        nx, ny = x + dx, y + dy
+        path = []
+        while 0 <= nx < 8 and 0 <= ny < 8 and board[nx][ny] == opp:
+            path.append((nx, ny))
+            nx += dx
+            ny += dy
+        if path and 0 <= nx < 8 and 0 <= ny < 8 and board[nx][ny] == player:
+            out += path
+    return out
+
+def reference_valid_moves(board, player):
+    return [(x, y) for x in range(8) for y in range(8)
+            if board[x][y] == "." and _captures(board, x, y, player)]
+
+def reference_make_move(board, x, y, player):
+    nb = [row[:] for row in board]
+    nb[x][y] = player
+    for px, py in _captures(board, x, y, player):
+        nb[px][py] = player
+    return nb
+
+# --- perft ---
+
+def perft(own, opp, depth, passed=False):
+    """ビットボード版。深さ1では合法手の数をそのまま数える"""
+    moves = legal_moves(own, opp)
+    if not moves:
+        if passed:
+            return 1    # 両者パス＝終局
+        return perft(opp, own, depth - 1, True) if depth > 1 else 1
+    if depth == 1:
+        return popcount(moves)
+    n = 0
+    for sq in iter_bits(moves):
+        f = flips(own, opp, sq)
+        n += perft(opp ^ f, own | f | (1 << sq), depth - 1)
+    return n
+
+def perft_board(valid_moves, make_move, board, player, depth, in_place=False, passed=False):
+    """リスト盤面版。フロントエンドの valid_moves/make_move をそのまま使う。
+    in_place=True は盤面を書き換える make_move（othello.py）用
+    """
+    moves = valid_moves(board, player)
+    other = opponent_of(player)
+    if not moves:
+        if passed:
+            return 1
+        if depth == 1:
+            return 1
+        return perft_board(valid_moves, make_move, board, other, depth - 1, in_place, True)
+    if depth == 1:
+        return len(moves)
+    n = 0
+    for x, y in moves:
+        if in_place:
+            child = copy.deepcopy(board)
+            make_move(child, x, y, player)
+        else:
+            child = make_move(board, x, y, player)
+        n += perft_board(valid_moves, make_move, child, other, depth - 1, in_place)
+    return n
+
+def front_ends():
+    """突き合わせる valid_moves/make_move の組 [(名前, valid_moves, make_move, in_place, init_board)]"""
+    import othello
+    import othello_ai_consol
+    import othello_gui
+    import othello_gui_ai
+    return [
+        ("othello", othello.valid_moves, othello.make_move, True, othello.init_board),
+        ("othello_ai_consol", othello_ai_consol.valid_moves, othello_ai_consol.make_move, False,
+         othello_ai_consol.init_board),
+        ("othello_gui", othello_gui.valid_moves, othello_gui.make_move, False, othello_gui.init_board),
+        ("othello_gui_ai", othello_gui_ai.valid_moves, othello_gui_ai.make_move, False,
+         othello_gui_ai.init_board),
+    ]
+
+def main():
+    ap = argparse.ArgumentParser(description="オセロの perft")
+    ap.add_argument("depth", type=int, nargs="?", default=8)
+    ap.add_argument("--check", type=int, default=0, metavar="DEPTH",
+                    help="参照実装とビットボード・各フロントエンドの valid_moves/make_move をこの深さまで突き合わせる")
+    ap.add_argument("--batch", action="store_true", help="NumPy の一括版 othello_batch でも数える")
+    args = ap.parse_args()
+
+    ok = True
+    black, white = initial_bits()
+    for d in range(1, args.depth + 1):
+        start = time.perf_counter()
+        n = perft(black, white, d)
+        took = time.perf_counter() - start
+        mark = ""
+        if d in KNOWN:
+            mark = "OK" if n == KNOWN[d] else f"NG（正しくは {KNOWN[d]}）"
+            ok &= n == KNOWN[d]
+        print(f"perft({d:2d}) = {n:>11,}  {took:8.3f}s  {n / max(took, 1e-9):>12,.0f} nodes/s  {mark}")
+
+    if args.batch:
+        import othello_batch
+        for d in range(1, args.depth + 1):
+            start = time.perf_counter()
+            n = othello_batch.perft(black, white, d)
+            took = time.perf_counter() - start
+            good = n == KNOWN.get(d, n)
+            ok &= good
+            print(f"batch perft({d:2d}) = {n:>11,}  {took:8.3f}s  {n / max(took, 1e-9):>12,.0f} nodes/s  "
+                  + ("OK" if good else f"NG（正しくは {KNOWN[d]}）"))
+
+    # 参照実装の値を正とする（ビットボードもここで突き合わせる）
+    expected = {}
+    for d in range(1, args.check + 1):
+        start = time.perf_counter()
+        n = perft_board(reference_valid_moves, reference_make_move, reference_init_board(), "X", d)
+        took = time.perf_counter() - start
+        expected[d] = n
+        bits = perft(black, white, d)
+        good = n == bits and n == KNOWN.get(d, n)
+        ok &= good
+        print(f"{'reference':18s} perft({d}) = {n:>9,}  {took:7.3f}s  {n / max(took, 1e-9):>10,.0f} nodes/s  "
+              + ("OK" if good else f"NG（ビットボードは {bits}, 既知の値は {KNOWN.get(d)}）"))
+
+    for name, valid_moves, make_move, in_place, init_board in (front_ends() if args.check else []):
+        for d in range(1, args.check + 1):
+            start = time.perf_counter()
+            n = perft_board(valid_moves, make_move, init_board(), "X", d, in_place)
+            took = time.perf_counter() - start
+            good = n == expected[d]
+            ok &= good
+            print(f"{name:18s} perft({d}) = {n:>9,}  {took:7.3f}s  {n / max(took, 1e-9):>10,.0f} nodes/s  "
+                  + ("OK" if good else f"NG（参照実装は {expected[d]}）"))
+
+    if not ok:
+        print("perft が一致しません", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+# othello_posdb.py
+# 局面データベース：棋譜ファイルの全対局の全局面を、対称形をまとめたキーで引けるようにする。
+#
+#   python othello_record.py import transcripts.txt games.bin        # テキストの棋譜を取り込む
+#   python othello_posdb.py build ~/.othello/games.bin positions.db   # 索引を作る（新しい対局だけ追加）
+#   python othello_posdb.py query positions.db f5d6c3 --records ~/.othello/games.bin
+#
+# 局面のキーは othello_book.canonical と同じ（8つの対称形のうち最小のものの Zobrist ハッシュ）。
+# ファイルはヘッダの後ろにキーの u64 配列（昇順）と、同じ順の (対局番号, 手数, 手番, 石差) の配列を
+# 並べたもの。引くときは両方を memmap して二分探索するので、何千万局面あってもメモリに載せない。
+# 対局を足すときも、並べ替えるのは新しい局面だけで、古い索引とは MERGE_CHUNK 局面ずつマージする。
+# 対局番号は索引を作った棋譜ファイル（othello_record）の何局目かで、棋譜はそちらから読む。
+# 途中でやめた対局（FINISHED でないもの）は勝敗がないので索引に入れない（番号は飛ぶ）。
+
+import argparse
+import os
+import struct
+import sys
+import time
+from array import array
+
+import numpy as np
+
+from othello_book import canonical
+from othello_engine import Position, board_to_bits, coords, iter_bits, legal_moves, play
+import othello_record as game_record
+
+MAGIC = b"OTPD"
+VERSION = 2                          # 2: 途中でやめた対局を除く
+HEADER = struct.Struct("<4sHHQQ")    # MAGIC, VERSION, 予備, 局面数, 索引済みの対局数
+# 局面ごとの情報。石差は終局時の（黒-白）
+ENTRY = np.dtype([("game", "<u4"), ("ply", "u1"), ("player", "u1"), ("result", "i1")])
+MERGE_CHUNK = 1 << 20                # 対局を足すときに古い索引を何局面ずつ読むか
+
+def game_positions(game):
+    """対局 game の着手前の各局面と終局の局面を (局面, 手数) で返す（パスした側の局面は除く）"""
+    pos = Position.initial()
+    ply = 0
+    for _, sq in game.plies():
+        if sq is None:
+            pos.pass_turn()
+            continue
+        yield pos, ply
+        pos.apply(sq)
+        ply += 1
+    yield pos, ply
+
+def index_games(games, first=0):
+    """対局の並びから (キー, ENTRY) の配列を作る（並べ替えはしない）。first は最初の対局番号。
+    途中でやめた対局は飛ばす
+    """
+    keys = array("Q")
+    cols = {name: array(code) for name, code in (("game", "I"), ("ply", "B"), ("player", "B"),
+                                                 ("result", "b"))}
+    for n, game in enumerate(games, first):
+        if not game.finished:
+            continue
+        for pos, ply in game_positions(game):
+            keys.append(canonical(pos.own, pos.opp)[0])
+            cols["game"].append(n)
+            cols["ply"].append(ply)
+            cols["player"].append(pos.player == "O")
+            cols["result"].append(game.result)
+    entries = np.empty(len(keys), dtype=ENTRY)
+    for name, col in cols.items():
+        entries[name] = np.frombuffer(col, dtype=ENTRY[name].newbyteorder("="))
+    return np.frombuffer(keys, dtype=np.uint64).copy(), entries
+
+class PositionDB:
+    """読み込み専用の局面データベース（memmap）"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as fp:
+            magic, version, _, n, n_games = HEADER.unpack(fp.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"局面データベースの形式が違います: {path}")
+        if os.path.getsize(path) < HEADER.size + n * (8 + ENTRY.itemsize):
+            raise ValueError(f"局面データベースが途中で切れています: {path}")
+        self.n_games = n_games
+        if n == 0:
+            self.keys = np.zeros(0, dtype="<u8")
+            self.entries = np.zeros(0, dtype=ENTRY)
+        else:
+            self.keys = np.memmap(path, dtype="<u8", mode="r", offset=HEADER.size, shape=(n,))
+            self.entries = np.memmap(path, dtype=ENTRY, mode="r", offset=HEADER.size + 8 * n, shape=(n,))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, own, opp):
+        """局面 (手番側の石, 相手の石) に来た対局の ENTRY 配列（対称形もまとめて）"""
+        key = np.uint64(canonical(own, opp)[0])
+        lo = np.searchsorted(self.keys, key, side="left")
+        hi = np.searchsorted(self.keys, key, side="right")
+        return self.entries[lo:hi]
+
+    def games(self, own, opp):
+        return [int(g) for g in self.lookup(own, opp)["game"]]
+
+    def stats(self, own, opp):
+        """この局面の対局数と、手番側から見た勝ち・引き分け・負けと平均石差"""
+        e = self.lookup(own, opp)
+        if not len(e):
+            return {"games": 0, "wins": 0, "draws": 0, "losses": 0, "mean": 0.0}
+        # 石差は黒から見た値なので、白番の局面では符号を変える
+        r = np.where(e["player"] == 1, -e["result"].astype(np.int64), e["result"].astype(np.int64))
+        return {"games": len(e), "wins": int((r > 0).sum()), "draws": int((r == 0).sum()),
+                "losses": int((r < 0).sum()), "mean": float(r.mean())}
+
+    def move_stats(self, own, opp):
+        """各合法手の後の局面の統計 [(マス番号, stats), ...]（手番側視点。来た対局のある手だけ）。
+        対称で同じ局面になる手は最初の1つだけ返す
+        """
+        out = []
+        seen = set()
+        for sq in iter_bits(legal_moves(own, opp)):
+            mover, other = play(own, opp, sq)
+            key, _ = canonical(other, mover)
+            if key in seen:
+                continue
+            seen.add(key)
+            st = self.stats(other, mover)
+            if st["games"]:
+                st = {"games": st["games"], "wins": st["losses"], "draws": st["draws"],
+                      "losses": st["wins"], "mean": -st["mean"]}
+                out.append((sq, st))
+        out.sort(key=lambda t: -t[1]["games"])
+        return out
+
+    def stats_board(self, board, player):
+        return self.stats(*board_to_bits(board, player))
+
+def _version(path):
+    with open(path, "rb") as fp:
+        magic, version, *_ = HEADER.unpack(fp.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"局面データベースではありません: {path}")
+    return version
+
+def write_db(path, keys, entries, n_games):
+    """keys の昇順に並べて書く（一時ファイルに書いてから置き換える）"""
+    order = np.argsort(keys, kind="stable")
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fp:
+        fp.write(HEADER.pack(MAGIC, VERSION, 0, len(keys), n_games))
+        fp.write(keys[order].astype("<u8").tobytes())
+        fp.write(entries[order].tobytes())
+    os.replace(tmp, path)
+
+def merge_db(path, keys, entries, n_games):
+    """既存の索引 path に (keys, entries) を足す（一時ファイルに書いてから置き換える）。
+    並べ替えるのは足す分だけで、古い索引は memmap のまま MERGE_CHUNK 局面ずつ読んでマージする。
+    同じキーの中では古い局面が先（全部作り直したときと同じ並び）。局面数を返す
+    """
+    order = np.argsort(keys, kind="stable")
+    keys, entries = keys[order], entries[order]
+    db = PositionDB(path)
+    n = len(db) + len(keys)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fp:
+        fp.write(HEADER.pack(MAGIC, VERSION, 0, n, n_games))
+        fp.truncate(HEADER.size + n * (8 + ENTRY.itemsize))
+    if n:
+        out_keys = np.memmap(tmp, dtype="<u8", mode="r+", offset=HEADER.size, shape=(n,))
+        out_entries = np.memmap(tmp, dtype=ENTRY, mode="r+", offset=HEADER.size + 8 * n, shape=(n,))
+        done = j = 0
+        for a in range(0, len(db), MERGE_CHUNK):
+            old_keys = np.asarray(db.keys[a:a + MERGE_CHUNK])
+            old_entries = np.asarray(db.entries[a:a + MERGE_CHUNK])
+            # この区間の最後のキーより小さい新しい局面を入れる（同じキーなら次の区間以降の古い局面の後ろ）
+            k = j + int(np.searchsorted(keys[j:], old_keys[-1], side="left"))
+            at = np.searchsorted(old_keys, keys[j:k], side="right") + np.arange(k - j)
+            m = len(old_keys) + k - j
+            new = np.zeros(m, dtype=bool)
+            new[at] = True
+            chunk_keys = np.empty(m, dtype="<u8")
+            chunk_entries = np.empty(m, dtype=ENTRY)
+            chunk_keys[new], chunk_keys[~new] = keys[j:k], old_keys
+            chunk_entries[new], chunk_entries[~new] = entries[j:k], old_entries
+            out_keys[done:done + m] = chunk_keys
+            out_entries[done:done + m] = chunk_entries
+            done += m
+            j = k
+        out_keys[done:] = keys[j:]
+        out_entries[done:] = entries[j:]
+        out_keys.flush()
+        out_entries.flush()
+        del out_keys, out_entries
+    del db
+    os.replace(tmp, path)
+    return n
+
+def build(records, path, rebuild=False, progress=None):
+    """棋譜ファイル records の索引を path に作る。既にあれば、まだ索引にない対局だけ足す
+    （旧い版の索引なら作り直す）。(追加した対局数, 局面数) を返す
+    """
+    n_games = game_record.count_games(records)
+    first = 0
+    if not rebuild and os.path.exists(path) and _version(path) == VERSION:
+        n_indexed = PositionDB(path).n_games
+        if n_indexed <= n_games:    # 多ければ棋譜ファイルが作り直されているので全部作り直す
+            first = n_indexed
+    games = game_record.read_games(records, first)
+    if progress:
+        games = progress(games)
+    keys, entries = index_games(games, first)
+    if first:
+        return n_games - first, merge_db(path, keys, entries, n_games)
+    write_db(path, keys, entries, n_games)
+    return n_games, len(keys)
+
+def cmd_build(args):
+    start = time.time()
+
+    def progress(games):
+        for i, g in enumerate(games, 1):
+            if i % 10000 == 0:
+                print(f"{i} 局 ({time.time() - start:.0f}s)", file=sys.stderr)
+            yield g
+
+    added, n = build(args.records, args.db, args.rebuild, progress)
+    print(f"{added} 局を追加、{n:,} 局面を {args.db} に書きました（{time.time() - start:.1f}s）")
+
+def cmd_query(args):
+    db = PositionDB(args.db)
+    game = game_record.Game.from_transcript(args.transcript.lower())
+    pos = game.final_position()
+    st = db.stats(pos.own, pos.opp)
+    print(f"{len(db):,} 局面 / {db.n_games} 局から検索")
+    print(f"{pos.player} 番, {st['games']} 局: {st['wins']} 勝 {st['draws']} 分 {st['losses']} 敗"
+          f"（平均石差 {st['mean']:+.1f}）")
+    for sq, s in db.move_stats(pos.own, pos.opp):
+        x, y = coords(sq)
+        print(f"  {'abcdefgh'[y]}{x + 1}: {s['games']:6d} 局  {s['wins']} 勝 {s['draws']} 分 "
+              f"{s['losses']} 敗  平均 {s['mean']:+.1f}")
+    if args.records:
+        for i in db.games(pos.own, pos.opp)[:args.games]:
+            g = game_record.read_game(args.records, i)
+            print(f"  #{i} {g.result:+3d} {g.transcript()}")
+
+def main():
+    ap = argparse.ArgumentParser(description="オセロの局面データベース")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("build", help="棋譜ファイルから索引を作る・新しい対局を足す")
+    p.add_argument("records", help="othello_record の棋譜ファイル")
+    p.add_argument("db", help="局面データベース")
+    p.add_argument("--rebuild", action="store_true", help="全部作り直す")
+    p.set_defaults(func=cmd_build)
+
+    p = sub.add_parser("query", help="局面の対局数・勝敗と各手の統計を表示する")
+    p.add_argument("db")
+    p.add_argument("transcript", nargs="?", default="", help="初期盤面からの棋譜（f5d6c3...）")
+    p.add_argument("--records", help="対局の棋譜も表示するときの棋譜ファイル")
+    p.add_argument("--games", type=int, default=5, help="表示する対局の数")
+    p.set_defaults(func=cmd_query)
+
+    args = ap.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# othello_probcut.py
+# Multi-ProbCut：浅い探索の値から深い探索の値を予測し、β を超える（α を下回る）ことが
+# 統計的にほぼ確実なら深い探索を省く選択的探索。
+#
+#   python othello_train.py selfplay samples.bin --games 200 --depth 1
+#   python othello_probcut.py fit samples.bin Resources/probcut.json --positions 400 --max-depth 7
+#
+# 深さ d の探索を深さ shallow_depth(d)（d と偶奇が同じ）の探索で代用する。
+# 深い値 ≈ a*浅い値 + b とその残差の標準偏差 sigma を、進行度 × d ごとに
+# 自己対戦の局面から最小二乗で求めておく。係数は評価器ごとに違うので、
+# パターン評価で使うときは --weights を付けて fit し直す。fit した評価器はファイルに
+# 記録し（evaluator_id）、読むときに探索の評価器と違えば ValueError にする。
+# 選択性レベルは何 sigma の確からしさで枝を切るかを決める（高いほど速く不正確）。
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import time
+
+from othello_engine import popcount
+from othello_search import MPC_MIN_DEPTH, Searcher
+from othello_train import RECORD
+import othello_pattern as pattern
+
+VERSION = 1
+N_STAGES = 4               # 進行度（空き 60〜46, 45〜31, 30〜16, 15〜）
+MIN_SAMPLES = 30           # fit に必要な (浅い値, 深い値) の組の数
+# 選択性レベルごとの閾値（何 sigma 外れたら切るか）。レベル 0 は ProbCut なし
+SELECTIVITY_T = [None, 2.0, 1.5, 1.0, 0.6]
+DEFAULT_PARAMS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              "Resources", "probcut.json")
+POSITIONAL = "positional"  # 位置重み評価（evaluator のない旧いファイルもこれ）
+
+def evaluator_id(weights=None):
+    """係数を fit した評価器の識別子。位置重みなら POSITIONAL、
+    パターン評価なら重みファイルの中身のハッシュ（ファイル名が変わっても同じ）
+    """
+    if not weights:
+        return POSITIONAL
+    with open(weights, "rb") as fp:
+        return "pattern:" + hashlib.sha1(fp.read()).hexdigest()[:16]
+
+def shallow_depth(depth):
+    """深さ depth の代わりに読む浅い深さ（偶奇をそろえる）"""
+    return depth - 2 * ((depth + 3) // 4)
+
+def stage_of(empties):
+    return min(N_STAGES - 1, (60 - empties) // 15)
+
+class ProbCut:
+    """params[(進行度, 深さ)] = (a, b, sigma)。Searcher(probcut=...) に渡す。
+    evaluator は係数を fit した評価器（evaluator_id）
+    """
+
+    def __init__(self, params, selectivity=1, evaluator=POSITIONAL):
+        if not 0 < selectivity < len(SELECTIVITY_T):
+            raise ValueError(f"選択性レベルは 1〜{len(SELECTIVITY_T) - 1}: {selectivity}")
+        self.params = params
+        self.evaluator = evaluator
+        self.selectivity = selectivity
+        self.t = SELECTIVITY_T[selectivity]
+
+    def try_cut(self, searcher, pos, depth, alpha, beta):
+        """浅い探索で深い探索の結果を予測する。切れるなら返す値（β か α）、切れなければ None"""
+        p = self.params.get((stage_of(pos.empties()), depth))
+        if p is None:
+            return None
+        a, b, sigma = p
+        shallow = shallow_depth(depth)
+        margin = self.t * sigma
+        if beta < math.inf:
+            # 浅い値がこれ以上なら、深い値が β 以上である確率が十分高い
+            bound = math.ceil((beta + margin - b) / a)
+            sc, _ = searcher.pvs(pos, shallow, bound - 1, bound)
+            if sc >= bound:
+                return beta
+        if alpha > -math.inf:
+            bound = math.floor((alpha - margin - b) / a)
+            sc, _ = searcher.pvs(pos, shallow, bound, bound + 1)
+            if sc <= bound:
+                return alpha
+        return None
+
+    def save(self, path):
+        rows = [{"stage": st, "depth": d, "a": a, "b": b, "sigma": sigma}
+                for (st, d), (a, b, sigma) in sorted(self.params.items())]
+        with open(path, "w") as fp:
+            json.dump({"version": VERSION, "evaluator": self.evaluator, "params": rows}, fp, indent=1)
+
+    @classmethod
+    def load(cls, path, selectivity=1, evaluator=None):
+        """evaluator（evaluator_id）を渡すと、違う評価器で fit したファイルなら ValueError"""
+        with open(path) as fp:
+            data = json.load(fp)
+        if data.get("version") != VERSION:
+            raise ValueError(f"ProbCut パラメータの形式が違います: {path}")
+        fitted = data.get("evaluator", POSITIONAL)
+        if evaluator is not None and fitted != evaluator:
+            raise ValueError(f"{path} は評価器 {fitted} で fit した係数です（探索の評価器は {evaluator}）。"
+                             f"othello_probcut.py fit --weights で作ったファイルを指定してください")
+        params = {(r["stage"], r["depth"]): (r["a"], r["b"], r["sigma"]) for r in data["params"]}
+        return cls(params, selectivity, fitted)
+
+def load_probcut(selectivity=1, path=None, weights=None):
+    """選択性レベル selectivity の ProbCut を作る（0 なら None = 全幅探索）。
+    weights（パターン重みファイル。None なら位置重み評価）で fit した係数でなければ ValueError。
+    path を省くと既定の係数（位置重み評価用）
+    """
+    if not selectivity:
+        return None
+    return ProbCut.load(path or DEFAULT_PARAMS, selectivity, evaluator_id(weights))
+
+# --- 自己対戦の局面から係数を求める ---
+
+def read_positions(path, n, rng, evaluator, min_empties):
+    """othello_train の局面ファイルから n 局面を無作為に選ぶ"""
+    count = os.path.getsize(path) // RECORD.size
+    positions = []
+    with open(path, "rb") as fp:
+        for i in rng.sample(range(count), min(n * 2, count)):
+            fp.seek(i * RECORD.size)
+            black, white, to_o, _, _ = RECORD.unpack(fp.read(RECORD.size))
+            own, opp, player = (white, black, "O") if to_o else (black, white, "X")
+            if 64 - popcount(own | opp) < min_empties:
+                continue
+            positions.append(evaluator.new_position(own, opp, player))
+            if len(positions) == n:
+                break
+    return positions
+
+def search_value(searcher, pos, depth):
+    """pos を depth 手読んだ値（置換表は毎回空にして、深い探索の結果を浅い探索に混ぜない）"""
+    searcher.tt.clear()
+    searcher.ordering.new_search()
+    sc, _ = searcher.pvs(pos, depth, -math.inf, math.inf)
+    return sc
+
+def linear_fit(pairs):
+    """y ≈ a*x + b の最小二乗。(a, b, 残差の標準偏差) を返す"""
+    n = len(pairs)
+    mx = sum(x for x, _ in pairs) / n
+    my = sum(y for _, y in pairs) / n
+    sxx = sum((x - mx) ** 2 for x, _ in pairs)
+    sxy = sum((x - mx) * (y - my) for x, y in pairs)
+    a = sxy / sxx if sxx else 1.0
+    b = my - a * mx
+    sigma = math.sqrt(sum((y - a*x - b) ** 2 for x, y in pairs) / n)
+    return a, b, sigma
+
+def fit_params(searcher, positions, max_depth):
+    pairs = {}
+    start = time.time()
+    for i, pos in enumerate(positions):
+        st = stage_of(pos.empties())
+        for d in range(MPC_MIN_DEPTH, max_depth + 1):
+            deep = search_value(searcher, pos, d)
+            shallow = search_value(searcher, pos, shallow_depth(d))
+            pairs.setdefault((st, d), []).append((shallow, deep))
+        if (i + 1) % 20 == 0:
+            print(f"{i + 1} 局面 ({time.time() - start:.0f}s)", file=sys.stderr)
+    params = {}
+    for key, ps in pairs.items():
+        if len(ps) < MIN_SAMPLES:
+            continue
+        a, b, sigma = linear_fit(ps)
+        if a > 0:
+            params[key] = (a, b, sigma)
+    return params
+
+def cmd_fit(args):
+    evaluator = pattern.load_evaluator(args.weights) if args.weights else None
+    # ProbCut なしの全幅探索で値を取る
+    searcher = Searcher(tt_mb=4, evaluator=evaluator)
+    positions = read_positions(args.samples, args.positions, random.Random(args.seed),
+                               searcher.evaluator, searcher.endgame_empties + 1)
+    params = fit_params(searcher, positions, args.max_depth)
+    ProbCut(params, evaluator=evaluator_id(args.weights)).save(args.params)
+    for (st, d), (a, b, sigma) in sorted(params.items()):
+        print(f"進行度 {st} 深さ {d}<-{shallow_depth(d)}: a={a:.3f} b={b:.1f} sigma={sigma:.1f}")
+    print(f"{len(positions)} 局面から fit して {args.params} に書きました")
+
+def main():
+    ap = argparse.ArgumentParser(description="Multi-ProbCut の係数")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("fit", help="局面ファイルから浅い値と深い値の関係を求める")
+    p.add_argument("samples", help="othello_train.py selfplay の局面ファイル")
+    p.add_argument("params", help="書き出すパラメータファイル（JSON）")
+    p.add_argument("--positions", type=int, default=400)
+    p.add_argument("--max-depth", type=int, default=7)
+    p.add_argument("--weights", help="パターン重み（省略時は位置重み評価）")
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=cmd_fit)
+
+    args = ap.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
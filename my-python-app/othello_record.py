@@ -0,0 +1,289 @@
+# othello_record.py
+# 対局の棋譜ファイル（1局 = 固定長のバイナリレコード）。追記しながら書き、1局ずつ読み出す。
+#
+#   python othello_record.py show ~/.othello/games.bin            # 局数・勝敗と最近の棋譜
+#   python othello_record.py show games.bin --all                 # 全局の棋譜を流す
+#   python othello_record.py import transcripts.txt games.bin     # 1行1局の棋譜（f5d6c3...）を取り込む
+#   python othello_record.py upgrade games.bin                    # 旧い形式（version 1）を今の形式にする
+#
+# 手は初期盤面からのマス番号（x*8+y）を1手1バイトで最大60手並べ、残りは END で埋める。
+# リセットなどで途中でやめた対局も残すので、終局まで打ったかどうかを FINISHED で持つ。
+# 途中の対局の石差はその時点のもので勝敗ではないので、集計や局面データベースでは除く。
+# パスは置ける手がないときにしか起きないので書かずに、読むときに補う（メモリ上の手の並びでは None）。
+# レコードは固定長なので、i 局目は seek だけで読め、途中で書き込みが切れても前の局は壊れない。
+
+import argparse
+import os
+import struct
+import sys
+import time
+
+from othello_engine import Position, coords, popcount, square
+
+MAGIC = b"OTGR"
+VERSION = 2
+HEADER = struct.Struct("<4sHH")       # MAGIC, VERSION, レコード長
+RECORD = struct.Struct("<IbBBB60s")   # 時刻(UNIX 秒), 石差(黒-白), 黒の種別, 白の種別, フラグ, 手
+RECORD_V1 = struct.Struct("<IbBB60s") # version 1（フラグなし。読むときに並べて終局か調べる）
+FINISHED = 1                          # フラグ：終局まで打った対局
+END = 0xFF                            # 手の並びの終わり
+UNKNOWN, HUMAN, ENGINE = 0, 1, 2      # 対局者の種別
+KIND_NAMES = {UNKNOWN: "?", HUMAN: "人間", ENGINE: "AI"}
+READ_CHUNK = 4096                     # 何局ずつまとめて読むか
+DEFAULT_RECORDS = os.path.join(os.path.expanduser("~"), ".othello", "games.bin")
+
+class Game:
+    """1局の棋譜。moves は初期盤面から打ったマス番号のリスト（パスは含めない）"""
+
+    def __init__(self, moves, black=UNKNOWN, white=UNKNOWN, timestamp=0, result=None, finished=None):
+        self.moves = list(moves)
+        self.black = black
+        self.white = white
+        self.timestamp = int(timestamp)
+        # 最後の局面の石差（黒-白）。None なら並べて数える
+        self.result = result if result is not None else self.final_diff()
+        # 終局まで打ったか（False なら result は勝敗ではない）。None なら並べて調べる
+        self.finished = finished if finished is not None else self.is_finished()
+
+    @classmethod
+    def from_moves(cls, moves, black=UNKNOWN, white=UNKNOWN, timestamp=0):
+        """マス番号・(x, y)・None（パス）の並びから作る。打てない手があれば ValueError"""
+        pos = Position.initial()
+        squares = []
+        for i, mv in enumerate(moves):
+            if mv is None:
+                if pos.moves():
+                    raise ValueError(f"{i + 1} 手目: 置ける手があるのにパスしています")
+                pos.pass_turn()
+                continue
+            sq = square(*mv) if isinstance(mv, tuple) else mv
+            if not pos.moves():
+                pos.pass_turn()
+            if not (pos.moves() >> sq) & 1:
+                raise ValueError(f"{i + 1} 手目 {coords(sq)} は打てません")
+            pos.apply(sq)
+            squares.append(sq)
+        return cls(squares, black, white, timestamp)
+
+    @classmethod
+    def from_transcript(cls, text, black=UNKNOWN, white=UNKNOWN, timestamp=0):
+        """'f5d6c3...'（列 a〜h + 行 1〜8）から作る"""
+        return cls.from_moves([square(int(text[i + 1]) - 1, "abcdefgh".index(text[i]))
+                               for i in range(0, len(text), 2)], black, white, timestamp)
+
+    def transcript(self):
+        return "".join("abcdefgh"[y] + str(x + 1) for x, y in map(coords, self.moves))
+
+    def plies(self):
+        """(手番, マス番号 or None) をパスも含めて順に返す"""
+        pos = Position.initial()
+        for sq in self.moves:
+            if not pos.moves():
+                yield pos.player, None
+                pos.pass_turn()
+            yield pos.player, sq
+            pos.apply(sq)
+
+    def final_position(self):
+        pos = Position.initial()
+        for _, sq in self.plies():
+            if sq is None:
+                pos.pass_turn()
+            else:
+                pos.apply(sq)
+        return pos
+
+    def final_diff(self):
+        pos = self.final_position()
+        diff = popcount(pos.own) - popcount(pos.opp)
+        return diff if pos.player == "X" else -diff
+
+    def is_finished(self):
+        return self.final_position().is_game_over()
+
+    def to_bytes(self):
+        if len(self.moves) > 60:
+            raise ValueError("61 手以上の棋譜は書けません")
+        body = bytes(self.moves) + bytes([END]) * (60 - len(self.moves))
+        flags = FINISHED if self.finished else 0
+        return RECORD.pack(self.timestamp, self.result, self.black, self.white, flags, body)
+
+    @classmethod
+    def from_fields(cls, timestamp, result, black, white, flags, body):
+        n = body.find(END)
+        return cls(body[:n if n >= 0 else 60], black, white, timestamp, result,
+                   bool(flags & FINISHED) if flags is not None else None)
+
+    @classmethod
+    def from_fields_v1(cls, timestamp, result, black, white, body):
+        return cls.from_fields(timestamp, result, black, white, None, body)
+
+# 形式の版ごとの (レコード, フィールド → Game)
+FORMATS = {1: (RECORD_V1, Game.from_fields_v1), 2: (RECORD, Game.from_fields)}
+
+def _check_header(fp, path):
+    """ヘッダを読んで、このファイルの (レコード, フィールド → Game, 版) を返す"""
+    data = fp.read(HEADER.size)
+    if len(data) < HEADER.size:
+        raise ValueError(f"棋譜ファイルのヘッダが切れています: {path}")
+    magic, version, size = HEADER.unpack(data)
+    if magic != MAGIC or version not in FORMATS or size != FORMATS[version][0].size:
+        raise ValueError(f"棋譜ファイルの形式が違います: {path}")
+    return FORMATS[version] + (version,)
+
+class RecordWriter:
+    """棋譜ファイルに追記する。ファイルがなければヘッダから書く。with で使う"""
+
+    def __init__(self, path):
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size > 0:
+            with open(path, "r+b") as fp:
+                if _check_header(fp, path)[2] != VERSION:
+                    raise ValueError(f"旧い形式の棋譜ファイルには追記できません"
+                                     f"（othello_record.py upgrade で変換してください）: {path}")
+                # 前回の書き込みが途中で切れていたら、その局を捨ててレコードの境目から書く
+                extra = (size - HEADER.size) % RECORD.size
+                if extra:
+                    fp.truncate(size - extra)
+            self.fp = open(path, "ab")
+        else:
+            self.fp = open(path, "ab")
+            self.fp.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+
+    def write(self, game):
+        self.fp.write(game.to_bytes())
+
+    def flush(self):
+        self.fp.flush()
+
+    def close(self):
+        self.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def append_game(path, game):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with RecordWriter(path) as w:
+        w.write(game)
+
+def save_game(moves, black=UNKNOWN, white=UNKNOWN, path=DEFAULT_RECORDS):
+    """フロントエンドの対局（(x, y) / None の並び）を追記する。1手もない・書けないなら False"""
+    if not any(mv is not None for mv in moves):
+        return False
+    try:
+        append_game(path, Game.from_moves(moves, black, white, time.time()))
+    except (OSError, ValueError) as e:    # 書き込めない・旧い形式のファイル・打てない手
+        print(f"棋譜を保存できませんでした: {e}", file=sys.stderr)
+        return False
+    return True
+
+def count_games(path):
+    with open(path, "rb") as fp:
+        record = _check_header(fp, path)[0]
+    return max(0, os.path.getsize(path) - HEADER.size) // record.size
+
+def read_games(path, start=0):
+    """start 局目から1局ずつ Game を返すジェネレータ（ファイルは READ_CHUNK 局ずつ読む）。
+    末尾の書きかけのレコードは読まない
+    """
+    with open(path, "rb") as fp:
+        record, make, _ = _check_header(fp, path)
+        fp.seek(HEADER.size + start * record.size)
+        while True:
+            data = fp.read(record.size * READ_CHUNK)
+            n = len(data) // record.size
+            for fields in record.iter_unpack(data[:n * record.size]):
+                yield make(*fields)
+            if n < READ_CHUNK:
+                return
+
+def read_game(path, i):
+    """i 局目だけを読む"""
+    with open(path, "rb") as fp:
+        record, make, _ = _check_header(fp, path)
+        fp.seek(HEADER.size + i * record.size)
+        data = fp.read(record.size)
+    if len(data) < record.size:
+        raise IndexError(f"{path} に {i} 局目はありません")
+    return make(*record.unpack(data))
+
+def cmd_show(args):
+    n = count_games(args.records)
+    black = white = draws = unfinished = 0
+    for g in read_games(args.records):
+        if not g.finished:
+            unfinished += 1
+            continue
+        black += g.result > 0
+        white += g.result < 0
+        draws += g.result == 0
+    print(f"{n} 局: 黒勝ち {black}, 白勝ち {white}, 引き分け {draws}"
+          + (f", 途中でやめた対局 {unfinished}" if unfinished else ""))
+    start = 0 if args.all else max(0, n - args.last)
+    for i, g in enumerate(read_games(args.records, start), start):
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(g.timestamp)) if g.timestamp else "-"
+        result = f"{g.result:+3d}" if g.finished else "中断"
+        print(f"{i:6d} {when} {KIND_NAMES.get(g.black, '?')}-{KIND_NAMES.get(g.white, '?')} "
+              f"{result} {g.transcript()}")
+
+def cmd_import(args):
+    n = bad = 0
+    os.makedirs(os.path.dirname(os.path.abspath(args.records)), exist_ok=True)
+    with open(args.transcripts) as fp, RecordWriter(args.records) as w:
+        for lineno, line in enumerate(fp, 1):
+            text = line.split("#")[0].strip().lower()
+            if not text:
+                continue
+            try:
+                w.write(Game.from_transcript(text))
+                n += 1
+            except (ValueError, IndexError) as e:
+                print(f"{args.transcripts}:{lineno}: 読み飛ばします（{e}）", file=sys.stderr)
+                bad += 1
+    print(f"{n} 局を {args.records} に追記しました" + (f"（{bad} 行は読めませんでした）" if bad else ""))
+
+def cmd_upgrade(args):
+    with open(args.records, "rb") as fp:
+        version = _check_header(fp, args.records)[2]
+    if version == VERSION:
+        print(f"{args.records} は今の形式です")
+        return
+    tmp = args.records + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    n = 0
+    with RecordWriter(tmp) as w:
+        for g in read_games(args.records):
+            w.write(g)
+            n += 1
+    os.replace(tmp, args.records)
+    print(f"{n} 局を version {version} から {VERSION} にしました")
+
+def main():
+    ap = argparse.ArgumentParser(description="オセロの棋譜ファイル")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("show", help="局数・勝敗と棋譜を表示する")
+    p.add_argument("records", nargs="?", default=DEFAULT_RECORDS)
+    p.add_argument("--last", type=int, default=10, help="最後の何局の棋譜を表示するか")
+    p.add_argument("--all", action="store_true", help="全局の棋譜を表示する")
+    p.set_defaults(func=cmd_show)
+
+    p = sub.add_parser("import", help="1行1局の棋譜テキストを取り込む")
+    p.add_argument("transcripts", help="棋譜テキスト（列 a〜h + 行 1〜8 の並び。# 以降は無視）")
+    p.add_argument("records", nargs="?", default=DEFAULT_RECORDS)
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("upgrade", help="旧い形式の棋譜ファイルを今の形式に書き直す")
+    p.add_argument("records", nargs="?", default=DEFAULT_RECORDS)
+    p.set_defaults(func=cmd_upgrade)
+
+    args = ap.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+# othello_search.py
+# 各フロントエンド共通のαβ探索（ビットボード + apply/undo + 置換表）
+
+import math
+import time
+
+from othello_endgame import DEFAULT_ENDGAME_EMPTIES, EndgameSolver
+from othello_engine import board_to_bits, coords, iter_bits
+from othello_eval import DEFAULT_EVALUATOR, SQ_WEIGHT
+from othello_order import MoveOrderer
+from othello_tt import EXACT, LOWER, UPPER, TranspositionTable
+
+DEFAULT_TT_MB = 16
+TIME_CHECK_INTERVAL = 256    # 何ノードごとに時計を見るか
+ASPIRATION_WINDOW = 16       # aspiration の窓の半幅（評価値の単位）
+MPC_MIN_DEPTH = 3            # ProbCut を試す最小の残り深さ
+N_CUTOFF_SLOTS = 8           # βカットした手の順位の集計（これ以降の順位はまとめる）
+
+class SearchTimeout(Exception):
+    """持ち時間切れで探索を打ち切った"""
+
+def ordered_moves(mask, first=None):
+    """位置重みの高い順に並べた合法手（マス番号）。first があれば先頭に"""
+    mvs = sorted(iter_bits(mask), key=SQ_WEIGHT.__getitem__, reverse=True)
+    if first is not None and first in mvs:
+        mvs.remove(first)
+        mvs.insert(0, first)
+    return mvs
+
+class SearchStats:
+    """探索1回分の統計（Searcher.stats）"""
+
+    def __init__(self):
+        self.depth = 0          # 読み切った深さ
+        self.tt_probes = 0      # 置換表を引いた回数
+        self.tt_hits = 0        # エントリが見つかった回数
+        self.tt_cutoffs = 0     # エントリの値だけで返せた回数
+        self.expanded = 0       # 子を読んだノード数
+        self.beta_cutoffs = 0   # そのうち β カットしたノード数
+        # 何番目に読んだ手で β カットしたか（0 = 最初の手）
+        self.cutoffs_by_index = [0] * N_CUTOFF_SLOTS
+        # 反復ごとの {"depth", "score", "move", "pv", "nodes", "time", "elapsed"}
+        self.iterations = []
+
+    @property
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def cutoff_rate(self):
+        return self.beta_cutoffs / self.expanded if self.expanded else 0.0
+
+    @property
+    def first_move_cutoff_rate(self):
+        """β カットのうち最初に読んだ手で起きた割合（着手順の良さ）"""
+        return self.cutoffs_by_index[0] / self.beta_cutoffs if self.beta_cutoffs else 0.0
+
+    def as_dict(self):
+        d = dict(vars(self))
+        d["tt_hit_rate"] = self.tt_hit_rate
+        d["cutoff_rate"] = self.cutoff_rate
+        d["first_move_cutoff_rate"] = self.first_move_cutoff_rate
+        return d
+
+class Searcher:
+    """置換表つきの negamax PVS 探索。
+    評価値は常に手番側視点で扱い、置換表にもそのまま保存する。
+    直近の探索の読み筋は pv に (x, y) のリスト（パスは None）で残す。
+    """
+
+    def __init__(self, tt_mb=DEFAULT_TT_MB, endgame_empties=DEFAULT_ENDGAME_EMPTIES, tt=None,
+                 evaluator=None, probcut=None):
+        # tt を渡すと置換表を他の探索器と共有する（Lazy SMP 用）
+        self.tt = tt if tt is not None else TranspositionTable(tt_mb)
+        # 評価器（既定は位置重み。othello_pattern.load_evaluator() でパターン評価）
+        self.evaluator = evaluator or DEFAULT_EVALUATOR
+        # 空きが endgame_empties 以下なら評価関数を使わず完全読みする
+        self.endgame_empties = endgame_empties
+        self.endgame = EndgameSolver(check=self.check_stop)
+        # キラー手・ヒストリーによる着手順（探索器ごとに持つ）
+        self.ordering = MoveOrderer()
+        # 選択的探索（othello_probcut.load_probcut() で作る。None なら全幅探索）
+        self.probcut = probcut
+        self.nodes = 0
+        self.stats = SearchStats()
+        self.pv = []
+        # 反復（深さ）を1つ読み終えるたびに hook(searcher, info) を呼ぶ。info は stats.iterations の要素
+        self.hooks = []
+        self.deadline = None    # time.perf_counter() の値。None なら時間無制限
+        self.stop = False       # 他スレッドから True にすると探索を打ち切る
+
+    def reset_stats(self):
+        self.nodes = 0
+        self.stats = SearchStats()
+        self._start = self._iter_start = time.perf_counter()
+
+    def stats_text(self):
+        """ステータス表示用の1行"""
+        st = self.stats
+        if not st.iterations:
+            return "探索なし"
+        return (f"深さ {st.depth}, {self.nodes:,} ノード, "
+                f"TT {st.tt_hit_rate:.0%}, 初手カット {st.first_move_cutoff_rate:.0%}")
+
+    def iteration_done(self, depth, score):
+        """深さ depth を読み終えた。統計に記録してフックを呼ぶ"""
+        now = time.perf_counter()
+        info = {"depth": depth, "score": score, "move": self.pv[0] if self.pv else None,
+                "pv": list(self.pv), "nodes": self.nodes,
+                "time": now - self._iter_start, "elapsed": now - self._start}
+        self._iter_start = now
+        self.stats.depth = depth
+        self.stats.iterations.append(info)
+        for hook in self.hooks:
+            hook(self, info)
+
+    def check_time(self):
+        self.nodes += 1
+        if self.nodes % TIME_CHECK_INTERVAL == 0:
+            self.check_stop()
+
+    def check_stop(self):
+        """stop が立っているか deadline を過ぎていれば SearchTimeout（完全読みからも呼ぶ）"""
+        if self.stop or (self.deadline is not None and time.perf_counter() > self.deadline):
+            raise SearchTimeout()
+
+    def new_position(self, board, player):
+        """リスト盤面から評価器に合った探索用の局面を作る"""
+        own, opp = board_to_bits(board, player)
+        return self.evaluator.new_position(own, opp, player)
+
+    def pvs(self, pos, depth, alpha, beta, first=None):
+        """negamax の PVS（NegaScout, fail-soft）。
+        長男だけ (α, β) で読み、残りはヌルウィンドウ (α, α+1) で調べて
+        α を超えたときだけ読み直す。評価値は手番側視点。
+        (評価値, 読み筋のマス番号のリスト) を返す（パスは None）。
+        first は最初に読む手（反復深化の前回最善手）
+        """
+        self.check_time()
+        stats = self.stats
+        if depth == 0:
+            return self.evaluator.evaluate(pos), []
+        hash_move = first
+        e = self.tt.probe(pos.hash)
+        stats.tt_probes += 1
+        if e is not None:
+            stats.tt_hits += 1
+            if hash_move is None:
+                hash_move = e[4]
+            if e[1] >= depth:
+                sc, bound = e[3], e[2]
+                if bound == EXACT or (bound == LOWER and sc >= beta) or (bound == UPPER and sc <= alpha):
+                    stats.tt_cutoffs += 1
+                    return sc, ([e[4]] if e[4] is not None else [])
+        if self.probcut is not None and depth >= MPC_MIN_DEPTH:
+            sc = self.probcut.try_cut(self, pos, depth, alpha, beta)
+            if sc is not None:
+                return sc, []
+        mvs = pos.moves()
+        if not mvs:
+            if not pos.opponent_moves():
+                return self.evaluator.evaluate(pos), []
+            # パスして相手番へ
+            pos.pass_turn()
+            sc, pv = self.pvs(pos, depth-1, -beta, -alpha)
+            pos.pass_turn()
+            return -sc, [None] + pv
+        alpha0 = alpha
+        best, best_move, best_pv = -math.inf, None, []
+        stats.expanded += 1
+        for i, sq in enumerate(self.ordering.order(pos, mvs, hash_move, depth)):
+            f = pos.apply(sq)
+            if i == 0:
+                sc, pv = self.pvs(pos, depth-1, -beta, -alpha)
+                sc = -sc
+            else:
+                sc, pv = self.pvs(pos, depth-1, -alpha-1, -alpha)
+                sc = -sc
+                if alpha < sc < beta:
+                    sc, pv = self.pvs(pos, depth-1, -beta, -alpha)
+                    sc = -sc
+            pos.undo(sq, f)
+            if sc > best:
+                best, best_move = sc, sq
+                if sc > alpha:
+                    alpha, best_pv = sc, [sq] + pv
+                    if alpha >= beta:
+                        stats.beta_cutoffs += 1
+                        stats.cutoffs_by_index[min(i, N_CUTOFF_SLOTS - 1)] += 1
+                        self.ordering.cutoff(pos, sq, depth)
+                        break
+        if best >= beta:
+            self.tt.store(pos.hash, depth, LOWER, best, best_move)
+        elif best > alpha0:
+            self.tt.store(pos.hash, depth, EXACT, best, best_move)
+        else:
+            self.tt.store(pos.hash, depth, UPPER, best, hash_move)
+        return best, best_pv
+
+    def complete_pv(self, pos, pv, depth):
+        """置換表での打ち切りで途切れた読み筋の続きを置換表の手でつなぎ、(x, y) のリストで返す"""
+        pos = pos.copy()
+        pv = list(pv)
+        for sq in pv:
+            if sq is None:
+                pos.pass_turn()
+            else:
+                pos.apply(sq)
+        while len(pv) < depth:
+            mvs = pos.moves()
+            if not mvs:
+                if not pos.opponent_moves():
+                    break
+                pos.pass_turn()
+                pv.append(None)
+                continue
+            e = self.tt.probe(pos.hash)
+            if e is None or e[4] is None or not (mvs >> e[4]) & 1:
+                break
+            pos.apply(e[4])
+            pv.append(e[4])
+        return [coords(sq) if sq is not None else None for sq in pv]
+
+    def begin(self, board, player):
+        """探索の開始：置換表の世代・着手順・統計を新しくして探索用の局面を返す"""
+        self.tt.new_search()
+        self.ordering.new_search()
+        pos = self.new_position(board, player)
+        self.reset_stats()
+        return pos
+
+    def solve_endgame(self, pos):
+        """終盤の完全読み。(最終石差, (x, y) or None)"""
+        try:
+            score, sq = self.endgame.solve_root(pos)
+        finally:
+            self.nodes = self.endgame.nodes
+        self.pv = [coords(sq)] if sq is not None else []
+        self.iteration_done(pos.empties(), score)
+        return score, (coords(sq) if sq is not None else None)
+
+    def search(self, board, player, depth, alpha=-math.inf, beta=math.inf):
+        """リスト盤面から player の最善手を探す。(評価値, (x, y) or None) を返す。
+        終盤（完全読み）では評価値の代わりに最終石差を返す
+        """
+        pos = self.begin(board, player)
+        if pos.empties() <= self.endgame_empties:
+            return self.solve_endgame(pos)
+        score, pv = self.pvs(pos, depth, alpha, beta)
+        self.pv = self.complete_pv(pos, pv, depth)
+        self.iteration_done(depth, score)
+        return score, (coords(pv[0]) if pv and pv[0] is not None else None)
+
+    def mtdf(self, pos, depth, guess):
+        """MTD(f)：guess を起点にヌルウィンドウ探索を繰り返して上限と下限を挟み込む。
+        読んだ結果は置換表に残るので、2回目以降の探索はほとんど表を引くだけで済む。
+        (評価値, 読み筋のマス番号のリスト) を返す
+        """
+        lower, upper = -math.inf, math.inf
+        score, pv = guess, []
+        while lower < upper:
+            beta = score + 1 if score == lower else score
+            score, p = self.pvs(pos, depth, beta - 1, beta)
+            if score < beta:
+                upper = score
+            else:
+                lower, pv = score, p
+        return score, pv
+
+    def search_mtdf(self, board, player, depth):
+        """深さ1から MTD(f) で反復深化し、前の深さの値を次の初期値にする。
+        (評価値, (x, y) or None) を返す。終盤は search() と同じく完全読み
+        """
+        pos = self.begin(board, player)
+        if pos.empties() <= self.endgame_empties:
+            return self.solve_endgame(pos)
+        score, pv = 0, []
+        for d in range(1, depth + 1):
+            score, pv = self.mtdf(pos, d, score)
+            # 最後が下振れ（上限の確定）で終わると pv が空なので置換表の手でつなぐ
+            self.pv = self.complete_pv(pos, pv, d)
+            self.iteration_done(d, score)
+        return score, (self.pv[0] if self.pv else None)
+
+    def aspiration(self, pos, depth, guess, window, first=None):
+        """guess ± window の窓で読み、外れた側だけ窓を倍々に広げて読み直す。
+        (評価値, 読み筋のマス番号のリスト) を返す
+        """
+        alpha, beta = guess - window, guess + window
+        while True:
+            sc, pv = self.pvs(pos, depth, alpha, beta, first=first)
+            if sc <= alpha:
+                window *= 2
+                alpha = sc - window
+            elif sc >= beta:
+                window *= 2
+                beta = sc + window
+            else:
+                return sc, pv
+
+    def search_timed(self, board, player, time_limit, max_depth=60, window=None):
+        """反復深化で time_limit 秒まで読む。
+        前回の最善手から読み始め、時間切れなら完了した最深の結果を返す。
+        window を指定すると深さ3以降は2つ前の深さの値 ± window の窓（aspiration）から読む。
+        オセロは手番の偶奇で評価値が振れるので、直前の深さより2つ前の方が近い。
+        (評価値, (x, y) or None, 読み切った深さ) を返す
+        """
+        pos = self.begin(board, player)
+        start = self._start
+        if pos.empties() <= self.endgame_empties:
+            # 完全読みには持ち時間の半分だけ使い、読み切れなければ残りで通常の反復深化をする
+            self.deadline = start + time_limit / 2
+            try:
+                return self.solve_endgame(pos) + (pos.empties(),)
+            except SearchTimeout:
+                if self.stop:
+                    return None, None, 0
+            finally:
+                self.deadline = None
+        score, best, reached = None, None, 0
+        scores = []
+        t0 = time.perf_counter()
+        remaining = start + time_limit - t0
+        try:
+            for depth in range(1, min(max_depth, pos.empties()) + 1):
+                try:
+                    if window is not None and len(scores) >= 2:
+                        sc, pv = self.aspiration(pos, depth, scores[-2], window, first=best)
+                    else:
+                        sc, pv = self.pvs(pos, depth, -math.inf, math.inf, first=best)
+                except SearchTimeout:
+                    break
+                score, best, reached = sc, (pv[0] if pv else None), depth
+                scores.append(sc)
+                self.pv = self.complete_pv(pos, pv, depth)
+                self.iteration_done(depth, sc)
+                # 深さ1は必ず読み切り、それ以降に時間制限をかける
+                self.deadline = start + time_limit
+                # 次の深さは数倍かかるので、残り時間の半分を過ぎたら打ち切る
+                if time.perf_counter() - t0 >= remaining / 2:
+                    break
+        finally:
+            self.deadline = None
+        return score, (coords(best) if best is not None else None), reached
+
+_default_searcher = None
+
+def default_searcher():
+    """フロントエンドが共有する探索器（置換表を手をまたいで使い回す）"""
+    global _default_searcher
+    if _default_searcher is None:
+        _default_searcher = Searcher()
+    return _default_searcher
+
+def search(board, player, depth, alpha=-math.inf, beta=math.inf, searcher=None):
+    return (searcher or default_searcher()).search(board, player, depth, alpha, beta)
+
+def search_mtdf(board, player, depth, searcher=None):
+    return (searcher or default_searcher()).search_mtdf(board, player, depth)
+
+def search_timed(board, player, time_limit, max_depth=60, searcher=None, window=None):
+    return (searcher or default_searcher()).search_timed(board, player, time_limit, max_depth, window)
+
+ALGORITHMS = ("alphabeta", "mtdf")
+
+def check_choice(time_limit=None, workers=None, smp_workers=None, algorithm="alphabeta", aspiration=None):
+    """choose() で一緒に使えない指定なら ValueError（黙って片方を捨てない）"""
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"algorithm は {' か '.join(ALGORITHMS)}: {algorithm}")
+    if workers and smp_workers:
+        raise ValueError("workers（ルート分割）と smp_workers（Lazy SMP）は一緒に使えません")
+    if workers and (time_limit is not None or aspiration is not None):
+        raise ValueError("workers（ルート分割）は深さ固定の全幅窓の探索だけです（time_limit・aspiration は使えません）")
+    if algorithm == "mtdf" and (time_limit is not None or aspiration is not None or workers or smp_workers):
+        raise ValueError("MTD(f) は深さ固定の直列探索だけです（time_limit・aspiration・workers・smp_workers は使えません）")
+
+def choose(board, player, *, depth, time_limit=None, workers=None, smp_workers=None,
+           algorithm="alphabeta", aspiration=None, searcher=None):
+    """フロントエンドの指定どおりの探索で player の手を読む。(評価値, (x, y) or None) を返す。
+    time_limit(秒)なら反復深化で持ち時間まで（depth は見ない）、なければ depth まで読む。
+    aspiration（窓の半幅）なら反復深化の各深さを前の値の周りの窓から読む。
+    workers はルート分割の、smp_workers は Lazy SMP のプロセス数（othello_parallel）。
+    algorithm="mtdf" なら深さ固定の探索を MTD(f) で行う。
+    一緒に使えない指定は ValueError（check_choice）
+    """
+    check_choice(time_limit, workers, smp_workers, algorithm, aspiration)
+    searcher = searcher or default_searcher()
+    if time_limit is not None:
+        depth = 60    # 持ち時間で読むときは深さで止めない
+    if smp_workers or workers:
+        import othello_parallel as parallel    # othello_parallel がこのモジュールを読むので中で読む
+        if smp_workers:
+            return parallel.search_lazy_smp(board, player, depth, smp_workers, searcher=searcher,
+                                            time_limit=time_limit, window=aspiration)
+        return parallel.search_parallel(board, player, depth, workers, searcher=searcher)
+    if time_limit is not None or aspiration is not None:
+        score, mv, _ = searcher.search_timed(board, player,
+                                             time_limit if time_limit is not None else math.inf,
+                                             max_depth=depth, window=aspiration)
+        return score, mv
+    if algorithm == "mtdf":
+        return searcher.search_mtdf(board, player, depth)
+    return searcher.search(board, player, depth)
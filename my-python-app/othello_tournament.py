@@ -0,0 +1,288 @@
+# othello_tournament.py
+# AI の設定どうしを自己対戦させて強さを比べる（回帰チェック用）
+#
+#   python othello_tournament.py depth=2 depth=3 --games 400
+#   python othello_tournament.py "name=pattern,depth=3,weights=Resources/pattern_weights.bin" depth=3 --plies 6
+#   python othello_tournament.py time=0.05,selectivity=2 time=0.05 --json result.json
+#   python othello_tournament.py depth=3 depth=3,selectivity=1 --record games.bin   # 棋譜も残す
+#
+# エンジンは "キー=値" をカンマでつないだ文字列で指定する（ENGINE_KEYS を参照）。
+# 開始局面は初期盤面から --plies 手の局面を対称形で重複を除いて全部並べ、seed で混ぜたもの。
+# 1つの開始局面を先後入れ替えて2局ずつ打つので、games は偶数に切り上げる。
+# 同じ開始局面を使い回すと決定的なエンジンどうしでは同じ対局になり、Elo の誤差を小さく見せて
+# しまうので、開始局面が足りなければ --plies を MAX_PLIES まで上げ、それでも足りなければ局数を減らす。
+# 対局はプロセスプールで並列に打ち、各ワーカーはエンジンを1組作って対局をまたいで使う
+# （置換表は対局ごとに空にする）。
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from othello_bench import notation, replay
+from othello_book import DEFAULT_BOOK, canonical, load_book
+from othello_engine import Position, coords, iter_bits, popcount, square
+from othello_eval import SQ_WEIGHT
+from othello_search import Searcher
+import othello_pattern as pattern
+import othello_probcut as mpc
+import othello_record as game_record
+
+# エンジン指定のキーと型。depth と time の両方がなければ depth=2
+ENGINE_KEYS = {
+    "name": str,          # 表示名（省略時は指定文字列そのもの）
+    "depth": int,         # 深さ固定で読む深さ
+    "time": float,        # 1手あたりの秒数（反復深化）。depth より優先
+    "weights": str,       # パターン重み（省略時は位置重み評価）
+    "selectivity": int,   # Multi-ProbCut の選択性レベル
+    "probcut": str,       # ProbCut の係数ファイル（weights と使うときはその重みで fit したもの）
+    "algorithm": str,     # "alphabeta" か "mtdf"
+    "aspiration": int,    # 反復深化の aspiration の窓の半幅
+    "book": str,          # 定跡ファイル（"book" だけなら既定の定跡）
+    "tt_mb": int,         # 置換表の大きさ
+}
+MAX_PLIES = 7             # 開始局面を増やすために上げる手数の上限（7手で 10649 局面）
+
+def parse_engine(text):
+    """'depth=3,selectivity=2' → 設定の dict"""
+    spec = {"name": text, "depth": 2, "tt_mb": 4}
+    for item in filter(None, text.split(",")):
+        key, eq, value = item.partition("=")
+        key = key.strip()
+        if key not in ENGINE_KEYS:
+            raise ValueError(f"エンジンの設定に {key} はありません（{', '.join(ENGINE_KEYS)}）")
+        if key == "book" and not eq:
+            value = DEFAULT_BOOK
+        spec[key] = ENGINE_KEYS[key](value.strip())
+    return spec
+
+class Engine:
+    """設定 spec どおりに手を選ぶ"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        evaluator = pattern.load_evaluator(spec["weights"]) if spec.get("weights") else None
+        probcut = mpc.load_probcut(spec.get("selectivity", 0), spec.get("probcut"), spec.get("weights"))
+        self.searcher = Searcher(spec["tt_mb"], evaluator=evaluator, probcut=probcut)
+        self.book = load_book(spec["book"]) if spec.get("book") else None
+
+    def new_game(self):
+        self.searcher.tt.clear()
+        self.searcher.ordering.clear()
+
+    def choose(self, pos):
+        """pos の手番の手（マス番号）"""
+        if self.book is not None:
+            sq = self.book.best_move(pos.own, pos.opp)
+            if sq is not None:
+                return sq
+        s, spec = self.searcher, self.spec
+        board, player = pos.to_board(), pos.player
+        window = spec.get("aspiration")
+        if "time" in spec:
+            _, mv, _ = s.search_timed(board, player, spec["time"], window=window)
+        elif window is not None:
+            _, mv, _ = s.search_timed(board, player, math.inf, max_depth=spec["depth"], window=window)
+        elif spec.get("algorithm") == "mtdf":
+            _, mv = s.search_mtdf(board, player, spec["depth"])
+        else:
+            _, mv = s.search(board, player, spec["depth"])
+        if mv is None:
+            return max(iter_bits(pos.moves()), key=SQ_WEIGHT.__getitem__)
+        return square(*mv)
+
+# --- 開始局面 ---
+
+def openings(plies, seed=0):
+    """初期盤面から plies 手の棋譜を、対称形で同じになる局面を除いて並べる"""
+    seen, out = set(), []
+
+    def walk(pos, transcript, n):
+        if n == plies:
+            key, _ = canonical(pos.own, pos.opp)
+            if key not in seen:
+                seen.add(key)
+                out.append(transcript)
+            return
+        for sq in iter_bits(pos.moves()):
+            f = pos.apply(sq)
+            walk(pos, transcript + notation(coords(sq)), n + 1)
+            pos.undo(sq, f)
+
+    walk(Position.initial(), "", 0)
+    random.Random(seed).shuffle(out)
+    return out
+
+def pick_openings(n, plies, seed=0):
+    """重複しない開始局面を n 個まで選ぶ。足りなければ MAX_PLIES まで手数を増やす。
+    (棋譜のリスト, 使った手数) を返す（MAX_PLIES でも足りなければ n より少ない）
+    """
+    starts = openings(plies, seed)
+    while len(starts) < n and plies < MAX_PLIES:
+        plies += 1
+        starts = openings(plies, seed)
+    return starts[:n], plies
+
+# --- ワーカープロセス側 ---
+
+_engines = None
+
+def _init_worker(specs):
+    global _engines
+    _engines = [Engine(spec) for spec in specs]
+
+def _play_game(game_id, transcript, black):
+    """engines[black] が黒で1局打つ。石差・手数・思考時間は engines[0] から見た向きで返す"""
+    board, player = replay(transcript)
+    pos = Position.from_board(board, player)
+    side = {"X": black, "O": 1 - black}
+    for e in _engines:
+        e.new_game()
+    moves = [0, 0]
+    spent = [0.0, 0.0]
+    played = [transcript]
+    while True:
+        if not pos.moves():
+            if not pos.opponent_moves():
+                break
+            pos.pass_turn()
+            continue
+        i = side[pos.player]
+        start = time.perf_counter()
+        sq = _engines[i].choose(pos)
+        spent[i] += time.perf_counter() - start
+        moves[i] += 1
+        played.append(notation(coords(sq)))
+        pos.apply(sq)
+    diff = popcount(pos.own) - popcount(pos.opp)    # 手番側から見た石差
+    if side[pos.player] != 0:
+        diff = -diff
+    return {"game": game_id, "opening": transcript, "black": black, "diff": diff,
+            "moves": moves, "time": spent, "transcript": "".join(played)}
+
+# --- 集計 ---
+
+def elo(wins, draws, losses):
+    """勝ち・引き分け・負けから (Elo 差, 95% 信頼区間の半幅)。全勝・全敗なら ±inf"""
+    n = wins + draws + losses
+    if n == 0:
+        return 0.0, math.inf
+    p = (wins + draws / 2) / n
+    var = (wins * (1 - p) ** 2 + draws * (0.5 - p) ** 2 + losses * p ** 2) / n
+    se = math.sqrt(var / n)
+
+    def to_elo(x):
+        if x <= 0:
+            return -math.inf
+        if x >= 1:
+            return math.inf
+        return -400 * math.log10(1 / x - 1)
+
+    if p in (0, 1):
+        return to_elo(p), math.inf
+    return to_elo(p), (to_elo(min(1, p + 1.96 * se)) - to_elo(max(0, p - 1.96 * se))) / 2
+
+def summarize(specs, games, took):
+    wins = sum(g["diff"] > 0 for g in games)
+    draws = sum(g["diff"] == 0 for g in games)
+    losses = len(games) - wins - draws
+    diff, err = elo(wins, draws, losses)
+    per_move = [sum(g["time"][i] for g in games) / max(1, sum(g["moves"][i] for g in games))
+                for i in range(2)]
+    return {
+        "engines": [s["name"] for s in specs], "specs": specs, "games": len(games),
+        "wins": wins, "draws": draws, "losses": losses,
+        "score": (wins + draws / 2) / len(games) if games else 0.0,
+        "elo": diff, "elo_error": err, "time_per_move": per_move,
+        "disc_diff": sum(g["diff"] for g in games) / len(games) if games else 0.0,
+        "time": took, "games_per_hour": len(games) / took * 3600 if took > 0 else 0.0,
+    }
+
+def print_summary(r, fp=sys.stdout):
+    a, b = r["engines"]
+    print(f"{a} vs {b}: {r['games']} 局", file=fp)
+    print(f"  {a} の {r['wins']} 勝 {r['draws']} 分 {r['losses']} 敗（得点率 {r['score']:.1%}, "
+          f"平均石差 {r['disc_diff']:+.1f}）", file=fp)
+    print(f"  Elo 差 {r['elo']:+.1f} ± {r['elo_error']:.1f}（95%）", file=fp)
+    print(f"  1手あたり {a}: {r['time_per_move'][0] * 1000:.1f}ms, {b}: {r['time_per_move'][1] * 1000:.1f}ms",
+          file=fp)
+    print(f"  {r['time']:.1f}s, {r['games_per_hour']:,.0f} 局/時", file=fp)
+
+def run(specs, n_games, plies=4, workers=None, seed=0, progress=None):
+    """n_games 局（偶数に切り上げ）打って対局結果のリストと所要時間を返す。
+    開始局面は使い回さないので、足りなければ手数を上げるか局数を減らす（標準エラーに出す）
+    """
+    pairs = (n_games + 1) // 2
+    starts, used = pick_openings(pairs, plies, seed)
+    if used != plies:
+        print(f"{plies} 手の開始局面では {pairs} 組に足りないので {used} 手にします", file=sys.stderr)
+    if len(starts) < pairs:
+        print(f"開始局面が {len(starts)} 個しかないので {2 * len(starts)} 局にします", file=sys.stderr)
+    jobs = [(i, starts[i // 2], i % 2) for i in range(2 * len(starts))]
+    start = time.time()
+    games = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                             initializer=_init_worker, initargs=(specs,)) as pool:
+        futures = [pool.submit(_play_game, *job) for job in jobs]
+        for fut in as_completed(futures):
+            games.append(fut.result())
+            if progress:
+                progress(games)
+    games.sort(key=lambda g: g["game"])
+    return games, time.time() - start
+
+def main():
+    ap = argparse.ArgumentParser(description="AI どうしの自己対戦で強さを比べる")
+    ap.add_argument("engine", nargs=2, help="エンジンの設定（例: depth=3,selectivity=2）")
+    ap.add_argument("--games", type=int, default=200, help="対局数（先後入れ替えで偶数に切り上げ）")
+    ap.add_argument("--plies", type=int, default=4,
+                    help="開始局面の手数（局数に足りなければ自動で上げる）")
+    ap.add_argument("--workers", type=int, default=None, help="プロセス数（省略時は CPU 数）")
+    ap.add_argument("--seed", type=int, default=0, help="開始局面の並びの乱数シード")
+    ap.add_argument("--json", metavar="PATH", help="結果を JSON で書き出す（- なら標準出力）")
+    ap.add_argument("--record", metavar="PATH", help="全局の棋譜をこの棋譜ファイルに追記する")
+    args = ap.parse_args()
+
+    try:
+        specs = [parse_engine(e) for e in args.engine]
+        for spec in specs:
+            # ワーカーの初期化で失敗すると原因が見えないので、係数ファイルはここで確かめる
+            mpc.load_probcut(spec.get("selectivity", 0), spec.get("probcut"), spec.get("weights"))
+    except (OSError, ValueError) as e:
+        ap.error(str(e))
+    if specs[0]["name"] == specs[1]["name"]:
+        specs[1]["name"] += "'"
+
+    def progress(games):
+        if len(games) % 20 == 0:
+            w = sum(g["diff"] > 0 for g in games)
+            d = sum(g["diff"] == 0 for g in games)
+            print(f"{len(games)} 局: +{w} ={d} -{len(games) - w - d}", file=sys.stderr)
+
+    games, took = run(specs, args.games, args.plies, args.workers, args.seed, progress)
+    report = summarize(specs, games, took)
+    if args.record:
+        now = time.time()
+        with game_record.RecordWriter(args.record) as w:
+            for g in games:
+                w.write(game_record.Game.from_transcript(g["transcript"], game_record.ENGINE,
+                                                         game_record.ENGINE, now))
+    if args.json != "-":
+        print_summary(report)
+    if args.json:
+        report["results"] = games
+        if args.json == "-":
+            json.dump(report, sys.stdout, indent=1)
+            print()
+        else:
+            with open(args.json, "w") as fp:
+                json.dump(report, fp, indent=1)
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
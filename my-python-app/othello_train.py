@@ -0,0 +1,199 @@
+# othello_train.py
+# 自己対戦から評価関数（パターン重み）を学習するツール
+#
+#   python othello_train.py selfplay samples.bin --games 1000 --depth 2
+#   python othello_train.py fit samples.bin Resources/pattern_weights.bin --epochs 3
+#
+# selfplay は局面と正解ラベルを samples.bin に追記していく（何度でも追記できる）。
+# ラベルは終盤ソルバーの最終石差：空きが --solve-empties 以下になった時点で完全読みし、
+# それより前の局面にはその値（手番に合わせて符号を変えたもの）を付ける。
+# fit はファイルを memmap で少しずつ読み、NumPy のミニバッチ SGD で
+# パターン表・モビリティ係数・定数項を進行度ごとに最小二乗フィットして
+# othello_pattern の重みファイルを書き出す。全件をメモリに載せない。
+
+import argparse
+import random
+import struct
+import sys
+import time
+from array import array
+
+from othello_endgame import EndgameSolver
+from othello_engine import Position, iter_bits, legal_moves, popcount
+from othello_search import Searcher
+import othello_pattern as pattern
+
+# 1局面 = 黒 u64, 白 u64, 手番 u8(0=X, 1=O), モビリティ差 i8, 石差 i8（いずれも手番側視点）
+RECORD = struct.Struct("<QQBbb")
+
+def mobility_diff(pos):
+    return popcount(legal_moves(pos.own, pos.opp)) - popcount(legal_moves(pos.opp, pos.own))
+
+def play_game(searcher, solver, rng, depth, random_plies, epsilon, solve_empties):
+    """1局打って [(黒, 白, 手番, モビリティ差, 石差), ...] を返す"""
+    pos = Position.initial()
+    history = []   # (黒, 白, 手番, モビリティ差)
+    label, label_player = None, None
+    ply = 0
+    while True:
+        mvs = pos.moves()
+        if not mvs:
+            if not pos.opponent_moves():
+                break
+            pos.pass_turn()
+            continue
+        black, white = (pos.own, pos.opp) if pos.player == "X" else (pos.opp, pos.own)
+        if pos.empties() <= solve_empties:
+            # ここから先は完全読みの値をそのままラベルにする
+            score, sq = solver.solve_root(pos)
+            if label is None:
+                label, label_player = score, pos.player
+            history.append((black, white, pos.player, mobility_diff(pos), score))
+        else:
+            history.append((black, white, pos.player, mobility_diff(pos), None))
+            moves = list(iter_bits(mvs))
+            if ply < random_plies or rng.random() < epsilon:
+                sq = rng.choice(moves)
+            else:
+                _, mv = searcher.search(pos.to_board(), pos.player, depth)
+                sq = mv[0]*8 + mv[1]
+        pos.apply(sq)
+        ply += 1
+    if label is None:
+        # 完全読みに入る前に終局した
+        own = pos.own if pos.player == "X" else pos.opp
+        opp = pos.opp if pos.player == "X" else pos.own
+        label, label_player = popcount(own) - popcount(opp), "X"
+    samples = []
+    for black, white, player, mob, score in history:
+        if score is None:
+            score = label if player == label_player else -label
+        samples.append((black, white, 0 if player == "X" else 1, mob, score))
+    return samples
+
+def cmd_selfplay(args):
+    rng = random.Random(args.seed)
+    evaluator = pattern.load_evaluator(args.weights) if args.weights else None
+    searcher = Searcher(evaluator=evaluator)
+    solver = EndgameSolver()
+    start = time.time()
+    n = 0
+    with open(args.samples, "ab") as fp:
+        for g in range(args.games):
+            for rec in play_game(searcher, solver, rng, args.depth, args.random_plies,
+                                 args.epsilon, args.solve_empties):
+                fp.write(RECORD.pack(*rec))
+                n += 1
+            if (g + 1) % 10 == 0:
+                print(f"{g + 1} 局 / {n} 局面 ({time.time() - start:.0f}s)", file=sys.stderr)
+    print(f"{args.games} 局, {n} 局面を {args.samples} に追記しました")
+
+# --- 学習（NumPy） ---
+
+def _features(np, batch):
+    """バッチから (進行度, 各パターンのインデックス(N, パターン数), モビリティ差, 目標値) を作る"""
+    black = batch["black"]
+    white = batch["white"]
+    to_o = batch["player"].astype(bool)
+    shifts = np.arange(64, dtype=np.uint64)
+    b = ((black[:, None] >> shifts) & np.uint64(1)).astype(np.int64)
+    w = ((white[:, None] >> shifts) & np.uint64(1)).astype(np.int64)
+    own = np.where(to_o[:, None], w, b)
+    opp = np.where(to_o[:, None], b, w)
+    digits = own + 2*opp        # 手番側=1, 相手=2（評価器の引き方と同じ）
+    n_discs = b.sum(axis=1) + w.sum(axis=1)
+    stage = np.clip((n_discs - 4) // pattern.STAGE_WIDTH, 0, pattern.N_STAGES - 1)
+    idx = np.empty((len(batch), len(pattern.INSTANCES)), dtype=np.int64)
+    for i, inst in enumerate(pattern.INSTANCES):
+        powers = 3 ** np.arange(len(inst) - 1, -1, -1, dtype=np.int64)
+        idx[:, i] = digits[:, list(inst)] @ powers
+    mob = batch["mobility"].astype(np.float64)
+    target = batch["score"].astype(np.float64) * pattern.SCALE
+    return stage, idx, mob, target
+
+def cmd_fit(args):
+    import numpy as np
+    dtype = np.dtype([("black", "<u8"), ("white", "<u8"), ("player", "u1"),
+                      ("mobility", "i1"), ("score", "i1")])
+    assert dtype.itemsize == RECORD.size
+    data = np.memmap(args.samples, dtype=dtype, mode="r")
+    n = len(data)
+    if n == 0:
+        sys.exit(f"{args.samples} に局面がありません")
+
+    # パターン種類ごとに、その種類に属するパターン（対称形）の列番号
+    group_cols = [[i for i, g in enumerate(pattern.INSTANCE_GROUP) if g == grp]
+                  for grp in range(len(pattern.GROUP_SIZES))]
+    tables = [np.zeros((pattern.N_STAGES, size)) for size in pattern.GROUP_SIZES]
+    mob_coef = np.zeros(pattern.N_STAGES)
+    bias = np.zeros(pattern.N_STAGES)
+    # 1局面に多数の項が同時に効くので、その数で学習率を割る
+    lr = args.lr / (len(pattern.INSTANCES) + 2)
+    rng = np.random.default_rng(args.seed)
+    starts = np.arange(0, n, args.batch)
+
+    for epoch in range(args.epochs):
+        rng.shuffle(starts)
+        sq_err = 0.0
+        for s in starts:
+            batch = np.array(data[s:s + args.batch])   # このバッチだけ読み込む
+            stage, idx, mob, target = _features(np, batch)
+            pred = mob_coef[stage] * mob + bias[stage]
+            for g, cols in enumerate(group_cols):
+                pred += tables[g][stage[:, None], idx[:, cols]].sum(axis=1)
+            err = pred - target
+            sq_err += float(err @ err)
+            # 表の各要素は、それを引いた局面の誤差の平均だけ動かす
+            for g, cols in enumerate(group_cols):
+                size = pattern.GROUP_SIZES[g]
+                keys = (stage[:, None] * size + idx[:, cols]).ravel()
+                e = np.repeat(err, len(cols))
+                grad = np.bincount(keys, weights=e, minlength=pattern.N_STAGES * size)
+                cnt = np.bincount(keys, minlength=pattern.N_STAGES * size)
+                tables[g] -= (lr * grad / np.maximum(cnt, 1)).reshape(pattern.N_STAGES, size)
+            cnt = np.bincount(stage, minlength=pattern.N_STAGES)
+            bias -= lr * np.bincount(stage, weights=err, minlength=pattern.N_STAGES) / np.maximum(cnt, 1)
+            mob_sq = np.bincount(stage, weights=mob * mob, minlength=pattern.N_STAGES)
+            mob_coef -= lr * np.bincount(stage, weights=err * mob, minlength=pattern.N_STAGES) / np.maximum(mob_sq, 1)
+        rmse = (sq_err / n) ** 0.5 / pattern.SCALE
+        print(f"epoch {epoch + 1}: RMSE {rmse:.2f} 石", file=sys.stderr)
+
+    ev = pattern.PatternEvaluator.zeros()
+    for stage in range(pattern.N_STAGES):
+        for g, t in enumerate(tables):
+            ev.weights[stage][g] = array("h", np.clip(np.rint(t[stage]), -32767, 32767)
+                                         .astype(np.int16).tolist())
+        ev.extras[stage] = [int(np.clip(np.rint(mob_coef[stage]), -32767, 32767)),
+                            int(np.clip(np.rint(bias[stage]), -32767, 32767))]
+    ev.save(args.weights)
+    print(f"{n} 局面から学習した重みを {args.weights} に書きました")
+
+def main():
+    ap = argparse.ArgumentParser(description="オセロ評価関数の学習")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("selfplay", help="自己対戦で学習用の局面を作る")
+    p.add_argument("samples", help="追記先の局面ファイル")
+    p.add_argument("--games", type=int, default=100)
+    p.add_argument("--depth", type=int, default=2, help="自己対戦の読みの深さ")
+    p.add_argument("--random-plies", type=int, default=8, help="序盤に乱択する手数")
+    p.add_argument("--epsilon", type=float, default=0.05, help="途中で乱択する確率")
+    p.add_argument("--solve-empties", type=int, default=10, help="完全読みでラベルを付け始める空き数")
+    p.add_argument("--weights", help="自己対戦に使うパターン重み（省略時は位置重み評価）")
+    p.add_argument("--seed", type=int, default=None)
+    p.set_defaults(func=cmd_selfplay)
+
+    p = sub.add_parser("fit", help="局面ファイルからパターン重みを学習する")
+    p.add_argument("samples")
+    p.add_argument("weights", help="書き出す重みファイル")
+    p.add_argument("--epochs", type=int, default=3)
+    p.add_argument("--batch", type=int, default=65536, help="1回に読む局面数")
+    p.add_argument("--lr", type=float, default=0.5)
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=cmd_fit)
+
+    args = ap.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
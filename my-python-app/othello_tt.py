@@ -0,0 +1,170 @@
+# othello_tt.py
+# 置換表（Zobrist ハッシュをキーにした固定サイズの表）
+
+from multiprocessing import shared_memory
+
+EXACT, LOWER, UPPER = 0, 1, 2   # 評価値の種類：確定値 / 下限 / 上限
+
+# 1エントリあたりの目安バイト数（タプル + int の概算）
+ENTRY_BYTES = 128
+SHARED_ENTRY_BYTES = 16         # SharedTranspositionTable は u64 2語
+_SCORE_BIAS = 1 << 31           # 評価値は符号なし32ビットにずらして詰める
+_NO_MOVE = 64                   # 手なし（パス）
+_VALID = 1 << 57                # 空きスロット（0）と区別する印
+
+class TranspositionTable:
+    """サイズ固定の置換表。
+    2エントリ1組のバケットで、同じ局面なら上書き、違えば
+    「古い探索のもの」→「浅いもの」の順に追い出す。
+    エントリは (key, depth, bound, score, move, generation)。
+    score は手番側から見た値、move はマス番号（パスなら None）。
+    エントリは不変のタプルを1スロットに代入するだけなので、
+    複数スレッドで共有してもロックなしで壊れた値は読まれない
+    （書き込みが競合したら片方が失われるだけ）。
+    """
+
+    def __init__(self, size_mb=16):
+        n = max(2, size_mb * 1024 * 1024 // ENTRY_BYTES)
+        # 2のべき乗に切り下げてマスクで引けるようにする
+        self.size = 1 << (n.bit_length() - 1)
+        self.mask = self.size - 2   # バケット先頭（偶数番地）を指すマスク
+        self.slots = [None] * self.size
+        self.generation = 0
+
+    def clear(self):
+        self.slots = [None] * self.size
+        self.generation = 0
+
+    def new_search(self):
+        """探索ごとに世代を進める（古いエントリを優先的に置き換える）"""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def probe(self, key):
+        i = key & self.mask
+        e = self.slots[i]
+        if e is not None and e[0] == key:
+            return e
+        e = self.slots[i + 1]
+        if e is not None and e[0] == key:
+            return e
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        i = key & self.mask
+        slots = self.slots
+        a, b = slots[i], slots[i + 1]
+        gen = self.generation
+        if a is None or a[0] == key:
+            j = i
+        elif b is None or b[0] == key:
+            j = i + 1
+        else:
+            # 今の探索で書かれた深いエントリほど残す
+            ka = (a[5] == gen, a[1])
+            kb = (b[5] == gen, b[1])
+            j = i if ka <= kb else i + 1
+        old = slots[j]
+        # 今の探索で得た同じ局面の深い結果は浅い結果で潰さない
+        if old is not None and old[0] == key and old[1] > depth and old[5] == gen:
+            return
+        slots[j] = (key, depth, bound, score, move, gen)
+
+    def usage(self):
+        """使用率（0.0〜1.0）"""
+        return sum(1 for e in self.slots if e is not None) / self.size
+
+class SharedTranspositionTable:
+    """プロセス間で共有する置換表（multiprocessing.shared_memory 上の u64 配列）。
+    TranspositionTable と同じ使い方・置き換え方で、probe も同じタプルを返す。
+    1エントリは (key ^ data, data) の2語で、data に評価値・深さ・種類・手・世代を詰める。
+    ロックは取らず、書き込みが競合して2語が食い違ったエントリは key が合わないので読まれない。
+    世代は先頭の語に置いて全プロセスで同じ値を使う（2語目は表の大きさ）。
+    pickle すると名前だけが渡り、ワーカー側で同じ共有メモリを開く（作った側が close() で消す）
+    """
+
+    def __init__(self, size_mb=16, name=None):
+        if name is None:
+            n = max(2, size_mb * 1024 * 1024 // SHARED_ENTRY_BYTES)
+            self.size = 1 << (n.bit_length() - 1)
+            self.shm = shared_memory.SharedMemory(create=True, size=16 * (self.size + 1))
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.words = self.shm.buf.cast("Q")
+        if self.owner:
+            self.clear()
+        else:
+            self.size = self.words[1]
+        self.mask = self.size - 2
+
+    def __reduce__(self):
+        return SharedTranspositionTable, (0, self.shm.name)
+
+    def __del__(self):
+        # 先に u64 の view を離さないと SharedMemory が閉じられない
+        if hasattr(self, "words"):
+            self.words.release()
+
+    def close(self):
+        """共有メモリを閉じる（作った側なら削除もする）"""
+        self.words.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def clear(self):
+        self.shm.buf[:] = bytes(self.shm.size)
+        self.words[1] = self.size    # 2語目は表の大きさ（開く側が読む）
+
+    @property
+    def generation(self):
+        return self.words[0]
+
+    @generation.setter
+    def generation(self, value):
+        self.words[0] = value
+
+    def new_search(self):
+        self.words[0] = (self.words[0] + 1) & 0xFF
+
+    def probe(self, key):
+        w = self.words
+        i = 2 + 2 * (key & self.mask)
+        d = w[i + 1]
+        if not d or w[i] ^ d != key:
+            i += 2
+            d = w[i + 1]
+            if not d or w[i] ^ d != key:
+                return None
+        mv = (d >> 42) & 0x7F
+        return (key, (d >> 32) & 0xFF, (d >> 40) & 3, (d & 0xFFFFFFFF) - _SCORE_BIAS,
+                None if mv == _NO_MOVE else mv, (d >> 49) & 0xFF)
+
+    def store(self, key, depth, bound, score, move):
+        w = self.words
+        i = 2 + 2 * (key & self.mask)
+        gen = w[0]
+        a, b = w[i + 1], w[i + 3]
+        if not a or w[i] ^ a == key:
+            j, old = i, a
+        elif not b or w[i + 2] ^ b == key:
+            j, old = i + 2, b
+        else:
+            # 今の探索で書かれた深いエントリほど残す
+            ka = ((a >> 49) & 0xFF == gen, (a >> 32) & 0xFF)
+            kb = ((b >> 49) & 0xFF == gen, (b >> 32) & 0xFF)
+            j, old = (i, a) if ka <= kb else (i + 2, b)
+        if (old and w[j] ^ old == key and (old >> 32) & 0xFF > depth
+                and (old >> 49) & 0xFF == gen):
+            return
+        sc = min(max(int(score) + _SCORE_BIAS, 0), 0xFFFFFFFF)
+        d = (sc | depth << 32 | bound << 40 | (_NO_MOVE if move is None else move) << 42
+             | gen << 49 | _VALID)
+        w[j + 1] = d
+        w[j] = key ^ d
+
+    def usage(self):
+        """使用率（0.0〜1.0）"""
+        w = self.words
+        return sum(1 for j in range(3, 2 * self.size + 2, 2) if w[j]) / self.size
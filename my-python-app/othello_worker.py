@@ -0,0 +1,127 @@
+# othello_worker.py
+# GUI 用：探索を別スレッドで走らせ、Tk のメインループは結果を覗くだけにする。
+#
+#   job = SearchWorker(searcher, ai_choice, (board,), {"depth": 3, "searcher": searcher}).start()
+#   ...
+#   root.after(POLL_MS, poll)   # poll で job.iterations() を表示し、job.done() なら job.result を使う
+#
+# Tk はメインスレッド以外から触れないので、読みの途中経過（Searcher.hooks）はキューに積み、
+# メインスレッドの poll 側で取り出す。
+# cancel() は searcher.stop を立てるだけで、check_time() が次に時計を見たところで探索が止まる
+# （完全読みとプロセス並列のワーカーも同じ stop で止まる）。止めた探索はすぐには抜けないので、
+# 同じ探索器で次の探索を始める前に done() になるのを待つこと。GUI では wait() で Tk のスレッドを
+# 止めず、root.after で done() を覗いて待つ。
+#
+# Ponder は相手の手番のあいだに同じ探索器で先読みしておく。直前の読み筋で予想した応手の後の
+# 局面を反復深化で読み続け、予想が当たって十分深く読めていればその手をそのまま使う。
+# 外れても置換表は温まっているので、続く探索は速くなる。
+
+import math
+import queue
+import threading
+
+from othello_engine import bits_to_board, board_to_bits, legal_moves, opponent_of, play, square
+from othello_search import SearchTimeout
+
+POLL_MS = 50    # GUI が結果を見に来る間隔（ミリ秒）
+
+class SearchWorker:
+    """fn(*args, **kwargs) を別スレッドで呼ぶ。fn は searcher で読む関数（Tk に触れないこと）"""
+
+    def __init__(self, searcher, fn, args=(), kwargs=None):
+        self.searcher = searcher
+        self.fn, self.args, self.kwargs = fn, args, kwargs or {}
+        self.result = None
+        self.error = None
+        self.best = None    # 読み終えた最後の反復の最善手 (x, y)。fn が落ちたときの代わりに使う
+        self.cancelled = False
+        self._progress = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        def hook(searcher, info):
+            if info["move"] is not None:
+                self.best = info["move"]
+            self._progress.put(info)
+
+        self.searcher.hooks.append(hook)
+        try:
+            self.result = self.fn(*self.args, **self.kwargs)
+        except SearchTimeout:
+            pass    # cancel() で止めた
+        except Exception as e:
+            self.error = e
+        finally:
+            self.searcher.hooks.remove(hook)
+
+    def start(self):
+        self.searcher.stop = False
+        self._thread.start()
+        return self
+
+    def done(self):
+        return not self._thread.is_alive()
+
+    def cancel(self):
+        """探索を止めて結果を捨てる（待たずに戻る）"""
+        self.cancelled = True
+        self.searcher.stop = True
+
+    def wait(self):
+        self._thread.join()
+
+    def iterations(self):
+        """前回呼んでから読み終えた反復の情報（Searcher.iteration_done の info）のリスト"""
+        out = []
+        while True:
+            try:
+                out.append(self._progress.get_nowait())
+            except queue.Empty:
+                return out
+
+def predicted_reply(searcher):
+    """直前の探索の読み筋から相手の応手 (x, y) を予想する。読み筋がない・パスなら None"""
+    if not searcher.stats.iterations or len(searcher.pv) < 2:
+        return None    # 定跡の手か、ルートの手しか分からない並列探索
+    return searcher.pv[1]
+
+class Ponder:
+    """相手 player の手番の board で先読みを始める。
+    reply（予想した応手）があればその後の局面を、なければ board を相手の側から読む
+    （全応手の部分木が置換表に入る）
+    """
+
+    def __init__(self, searcher, board, player, reply=None, max_depth=60):
+        self.reply = reply
+        if reply is not None:
+            own, opp = board_to_bits(board, player)
+            opp, own = play(own, opp, square(*reply))
+            if legal_moves(own, opp):
+                board, player = bits_to_board(own, opp, opponent_of(player)), opponent_of(player)
+            else:
+                self.reply = None    # 応手の後はこちらがパス：全応手を読む
+        self.empties = sum(r.count(".") for r in board)
+        self.job = SearchWorker(searcher, searcher.search_timed, (board, player, math.inf),
+                                {"max_depth": max_depth}).start()
+
+    def cancel(self):
+        self.job.cancel()
+
+    def finish(self, move, depth=None, time_limit=None):
+        """相手が move を打った。先読みを止め、そのまま使える手 (x, y) があれば返す（なければ None）。
+        深さ固定なら depth まで（完全読みなら最後まで）、持ち時間なら time_limit の半分以上
+        読めていれば使う（search_timed が次の深さに進まない目安と同じ）。
+        止めた探索が抜けるのは待たないので、次に同じ探索器で読む前に job.done() を確かめること
+        """
+        self.job.cancel()
+        if self.reply is None or move != self.reply:
+            return None
+        its = self.job.iterations()
+        if not its or its[-1]["move"] is None:
+            return None
+        last = its[-1]
+        if time_limit is not None:
+            enough = last["elapsed"] >= time_limit / 2
+        else:
+            enough = last["depth"] >= min(depth, self.empties)
+        return last["move"] if enough else None
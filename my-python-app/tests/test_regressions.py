@@ -0,0 +1,142 @@
+# 合法手生成・一括版・棋譜ファイルの回帰テスト（python -m pytest tests）
+
+import argparse
+import random
+
+import pytest
+
+import othello_perft as perft
+import othello_record as rec
+from othello_engine import Position, flips, initial_bits, iter_bits, legal_moves
+
+CHECK_DEPTH = 4    # フロントエンドはリスト盤面で遅いのでこの深さまで
+
+def random_positions(n, seed=0):
+    """初期盤面から無作為に打った途中局面（パスした局面も含む）"""
+    rng = random.Random(seed)
+    out = []
+    while len(out) < n:
+        pos = Position.initial()
+        for _ in range(rng.randrange(0, 60)):
+            if not pos.moves():
+                if not pos.opponent_moves():
+                    break
+                pos.pass_turn()
+                continue
+            pos.apply(rng.choice(list(iter_bits(pos.moves()))))
+        out.append(pos)
+    return out
+
+def random_game(rng):
+    """終局まで無作為に打った対局の手（マス番号）"""
+    pos = Position.initial()
+    moves = []
+    while not pos.is_game_over():
+        if not pos.moves():
+            pos.pass_turn()
+            continue
+        sq = rng.choice(list(iter_bits(pos.moves())))
+        pos.apply(sq)
+        moves.append(sq)
+    return moves
+
+# --- perft ---
+
+@pytest.mark.parametrize("depth", range(1, CHECK_DEPTH + 1))
+def test_reference_matches_bitboard(depth):
+    black, white = initial_bits()
+    n = perft.perft_board(perft.reference_valid_moves, perft.reference_make_move,
+                          perft.reference_init_board(), "X", depth)
+    assert n == perft.KNOWN[depth]
+    assert perft.perft(black, white, depth) == n
+
+def test_bitboard_known():
+    black, white = initial_bits()
+    for depth in range(1, 7):
+        assert perft.perft(black, white, depth) == perft.KNOWN[depth]
+
+@pytest.mark.parametrize("front_end", perft.front_ends(), ids=lambda f: f[0])
+def test_front_ends(front_end):
+    _, valid_moves, make_move, in_place, init_board = front_end
+    assert init_board() == perft.reference_init_board()
+    for depth in range(1, CHECK_DEPTH + 1):
+        assert perft.perft_board(valid_moves, make_move, init_board(), "X", depth, in_place) \
+            == perft.KNOWN[depth]
+
+# --- othello_batch ---
+
+def test_batch_matches_scalar():
+    batch = pytest.importorskip("othello_batch")
+    positions = random_positions(300)
+    own = [p.own for p in positions]
+    opp = [p.opp for p in positions]
+    moves = batch.legal_moves(own, opp)
+    assert [int(m) for m in moves] == [legal_moves(p.own, p.opp) for p in positions]
+
+    parent, sq, c_own, c_opp = batch.expand(own, opp)
+    expected = []
+    for i, p in enumerate(positions):
+        for s in iter_bits(legal_moves(p.own, p.opp)):
+            f = flips(p.own, p.opp, s)
+            expected.append((i, s, p.opp ^ f, p.own | f | (1 << s)))
+    got = sorted(zip(*(map(int, a) for a in (parent, sq, c_own, c_opp))))
+    assert got == sorted(expected)
+
+def test_batch_perft():
+    batch = pytest.importorskip("othello_batch")
+    black, white = initial_bits()
+    for depth in range(1, 7):
+        assert batch.perft(black, white, depth) == perft.KNOWN[depth]
+
+# --- 棋譜ファイル ---
+
+def write_v1(path, games):
+    """version 1 の棋譜ファイルを書く（フラグなし）"""
+    with open(path, "wb") as fp:
+        fp.write(rec.HEADER.pack(rec.MAGIC, 1, rec.RECORD_V1.size))
+        for g in games:
+            body = bytes(g.moves) + bytes([rec.END]) * (60 - len(g.moves))
+            fp.write(rec.RECORD_V1.pack(g.timestamp, g.result, g.black, g.white, body))
+
+def sample_games():
+    rng = random.Random(1)
+    games = [rec.Game(random_game(rng), rec.HUMAN, rec.ENGINE, 1700000000 + i) for i in range(5)]
+    # 途中でやめた対局
+    games.append(rec.Game(random_game(rng)[:20], rec.ENGINE, rec.HUMAN, 1700000100))
+    return games
+
+def same_game(a, b):
+    return (a.moves, a.black, a.white, a.timestamp, a.result, a.finished) == \
+        (b.moves, b.black, b.white, b.timestamp, b.result, b.finished)
+
+def test_record_round_trip(tmp_path):
+    path = str(tmp_path / "games.bin")
+    games = sample_games()
+    with rec.RecordWriter(path) as w:
+        for g in games:
+            w.write(g)
+    assert rec.count_games(path) == len(games)
+    read = list(rec.read_games(path))
+    assert all(same_game(a, b) for a, b in zip(games, read))
+    assert [g.finished for g in read] == [True] * 5 + [False]
+    assert same_game(rec.read_game(path, 3), games[3])
+    assert rec.Game.from_transcript(games[0].transcript()).moves == games[0].moves
+
+def test_record_v1_upgrade(tmp_path):
+    path = str(tmp_path / "games.bin")
+    games = sample_games()
+    write_v1(path, games)
+    # version 1 も読め、フラグは並べて調べる
+    read = list(rec.read_games(path))
+    assert len(read) == len(games)
+    assert all(same_game(a, b) for a, b in zip(games, read))
+    with pytest.raises(ValueError):
+        rec.RecordWriter(path)
+    assert not rec.save_game([(2, 3)], path=path)
+
+    rec.cmd_upgrade(argparse.Namespace(records=path))
+    with open(path, "rb") as fp:
+        assert rec._check_header(fp, path)[2] == rec.VERSION
+    assert all(same_game(a, b) for a, b in zip(games, rec.read_games(path)))
+    assert rec.save_game([(2, 3)], path=path)
+    assert rec.count_games(path) == len(games) + 1